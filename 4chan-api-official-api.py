@@ -1,8 +1,20 @@
-import requests
-import json
 from datetime import datetime, timezone, timedelta
-import re
 import os
+import time
+from fourchan_fetch import (fetch_concurrently, fetch_json_if_modified,
+                            catalog_url, thread_url, thread_priority, NOT_MODIFIED)
+import api_backend
+from time_window import thread_overlaps, posts_in_window
+from board_fanout import fetch_fair, board_label
+from post_filter import PostFilter
+from crawl_state import CrawlState
+from keyword_matcher import get_matcher
+from html_cleaner import clean_html
+from response_cache import ResponseCache, CACHE_DIR
+from result_sink import RunManifest, MemorySink, JsonlSink, write_text_report, report_path
+from post_store import PostStore
+from seen_index import SeenIndex, settings_signature
+from run_metrics import get_metrics, serve_metrics
 
 # ============================================================================
 # CONFIGURATION - MODIFY THESE SETTINGS
@@ -11,6 +23,9 @@ import os
 # Keywords to search for (case-insensitive)
 KEYWORDS = ["trump", "election", "vote", "biden", "government", "president", "policy", "democrat", "republican"]
 
+# Only match whole words ("vote" will no longer match "devoted", but also not "votes")
+WHOLE_WORD = False
+
 # Time range configuration
 # NOTE: 4chan catalog only shows CURRENTLY ACTIVE threads
 # You can only get posts that are still live on the board
@@ -35,60 +50,76 @@ END_DATE = datetime.now(timezone.utc)
 # Board to search (default: pol)
 BOARD = "pol"
 
+# Several boards at once (None = only BOARD). They are crawled as one job on a
+# shared worker pool and request budget, taking turns so a busy board cannot
+# starve the others; every match carries its board (see board_fanout.py)
+BOARDS = None  # e.g. ["pol", "int", "news", "biz"]
+RUN_BOARDS = BOARDS or [BOARD]
+
+# Post filters (see post_filter.py), checked on the raw post before its HTML is
+# cleaned, e.g. {"country": "Denmark"}, {"has_file": True, "op_only": True} or
+# {"poster_id": ["a1b2c3d4"]}. The time range is START_DATE/END_DATE above.
+FILTERS = {}
+
+# Number of threads downloaded in parallel (1 = one at a time like before)
+# Requests per second per host are capped in request_scheduler.py (HOST_LIMITS)
+MAX_WORKERS = 8
+
+# Incremental crawling: remember thread modification times between runs and only
+# download threads that changed since the last run (useful when run from cron)
+INCREMENTAL = False
+STATE_FILE = os.path.join("output_official_api", f"{board_label(RUN_BOARDS)}_crawl_state.json")
+
+# Skip posts an earlier run already checked, so back-to-back runs with overlapping
+# time ranges only report new matches (and only clean new posts). Post numbers are
+# remembered per board in SEEN_DIR (see seen_index.py); changing KEYWORDS,
+# WHOLE_WORD or FILTERS starts the index over.
+SKIP_SEEN_POSTS = False
+SEEN_DIR = os.path.join("output_official_api", "seen_posts")
+
+# Output: matches are streamed to a JSON Lines file as they are found.
+# If a run is interrupted, the next run resumes it instead of starting over.
+OUTPUT_DIR = "output_official_api"
+COMPRESS_OUTPUT = False  # True writes .jsonl.gz instead of .jsonl
+MANIFEST_FILE = os.path.join(OUTPUT_DIR, f"{board_label(RUN_BOARDS)}_run_manifest.json")
+
+# Watch mode: keep running, poll the catalog every POLL_INTERVAL seconds and
+# report matches in new posts as soon as they appear (START_DATE/END_DATE are
+# not used). Stop with Ctrl+C. 4chan asks for at most one catalog/thread
+# request per thread every 10 seconds, so keep POLL_INTERVAL at 10 or more.
+WATCH_MODE = False
+POLL_INTERVAL = 15
+WATCH_BACKFILL = False  # True also checks the posts already on the board at startup
+
+# Keep downloaded threads in a local cache (archived/closed threads forever,
+# live threads for a couple of minutes, see response_cache.py)
+USE_CACHE = True
+
+# Also store every downloaded post (not only matches) in a SQLite database with
+# a full-text index, so new keywords/time ranges/countries can be searched later
+# without crawling again (see query-post-store.py). None disables the store.
+POST_STORE = None  # e.g. os.path.join(OUTPUT_DIR, f"{BOARD}_posts.sqlite")
+
+# Print every match as it is found (slow with thousands of matches). Otherwise a
+# progress line is printed every few seconds and a timing summary at the end,
+# also saved as <output>_metrics.json.
+VERBOSE = False
+
+# Watch mode only: serve counters and stage timers for Prometheus at
+# http://127.0.0.1:<port>/metrics (None = off)
+METRICS_PORT = None
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def clean_html(text):
-    """Remove HTML tags and decode entities from 4chan post text"""
-    if not text:
-        return ""
-    
-    # Remove HTML tags
-    clean = re.sub(r'<[^<]+?>', '', text)
-    
-    # Decode common HTML entities
-    clean = clean.replace('&gt;', '>')
-    clean = clean.replace('&lt;', '<')
-    clean = clean.replace('&quot;', '"')
-    clean = clean.replace('&amp;', '&')
-    clean = clean.replace('&#039;', "'")
-    clean = clean.replace('<br>', '\n')
-    clean = clean.replace('<wbr>', '')
-    
-    # Clean up 4chan quote links (>>123456789>)
-    clean = re.sub(r'>>\d+>', '', clean)  # Remove quote links like >>519431737>
-    # like in "post_text": ">>519433413>We already know that people who didn't get the vaccine are more rural and unhealthier than those who did get the vaccineApproximately 6.5 million healthy young adults (ages 18-49) in Canada received at least one covid vaccine dose, based on 2023 national coverage rates of 75% across this group. That ESMO study getting all the media hype right now is totally bogus and cooked up on political orders, because the cancer-causing effects of gene therapy disguised as a \"covid vaccine\" are slowly breaking through to public awareness and thats a deadly threat to the murderers running governments.",
-
-    
-    # Clean up greentext arrows at start of lines
-    clean = re.sub(r'^>+', '> ', clean, flags=re.MULTILINE)  # Normalize greentext
-    
-    # WHAT IS GREENTEXT?
-    # Greentext is a distinctive 4chan posting style where lines starting with ">" appear in green color
-    # Used for storytelling, quoting, implications, or emphasis. Common formats:
-    # > be me                    (storytelling format)
-    # > 22 years old
-    # > decide to learn coding
-    # > implying democracy works (sarcastic implications)
-    # > Trump wins election      (listing points/events)
-    # The regex above normalizes multiple arrows (>>>, >>>>) to single "> " for cleaner output
-    
-    return clean.strip()
-
 def check_keywords(text, keywords):
     """Check if any keywords are present in the text (case-insensitive)"""
     if not text:
         return []
     
-    text_lower = text.lower()
-    matched = []
-    
-    for keyword in keywords:
-        if keyword.lower() in text_lower:
-            matched.append(keyword)
-    
-    return matched
+    # One compiled automaton per keyword list, scanned once per post
+    return get_matcher(keywords, whole_word=WHOLE_WORD).match(text)
 
 def format_timestamp(unix_timestamp):
     """Convert Unix timestamp to readable format"""
@@ -101,157 +132,420 @@ def format_timestamp(unix_timestamp):
 # MAIN FUNCTIONS
 # ============================================================================
 
+thread_cache = ResponseCache(CACHE_DIR) if USE_CACHE else None
+post_store = PostStore(POST_STORE) if POST_STORE else None
+post_filter = PostFilter(FILTERS)
+seen_posts = SeenIndex(SEEN_DIR, settings_signature(KEYWORDS, WHOLE_WORD, FILTERS)) if SKIP_SEEN_POSTS else None
+metrics = get_metrics()
+
 def get_catalog(board):
     """Fetch the catalog for a specific board"""
-    try:
-        url = f"https://a.4cdn.org/{board}/catalog.json"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        print(f"Error fetching catalog: {e}")
-        return None
+    return api_backend.get_catalog(board)
 
-def get_thread_posts(board, thread_no):
-    """Fetch all posts from a specific thread"""
-    try:
-        url = f"https://a.4cdn.org/{board}/thread/{thread_no}.json"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        print(f"Error fetching thread {thread_no}: {e}")
+def get_thread_posts(board, thread_no, priority=None):
+    """Fetch all posts from a specific thread (cached, see api_backend.py)"""
+    thread_data, _ = api_backend.get_thread(board, thread_no, cache=thread_cache, priority=priority)
+    return thread_data
+
+def match_post(board, thread_no, post, keywords):
+    """Clean a post and check it for keywords, returning its output record or None"""
+    # Clean and check post content
+    with metrics.timer("clean"):
+        post_text = clean_html(post.get('com', ''))
+        thread_title = clean_html(post.get('sub', ''))
+    
+    # Combine title and text for keyword searching
+    full_text = f"{thread_title} {post_text}"
+    
+    # Check for keywords
+    with metrics.timer("match"):
+        matched_keywords = check_keywords(full_text, keywords)
+    if not matched_keywords:
         return None
+    
+    post_time = post.get('time', 0)
+    return {
+        'board': board,
+        'thread_no': thread_no,
+        'post_no': post.get('no'),
+        'thread_title': thread_title or "No Title",
+        'post_text': post_text,
+        'poster_name': post.get('name', 'Anonymous'),
+        'poster_id': post.get('id', ''),
+        'timestamp': post_time,
+        'human_time': format_timestamp(post_time),
+        'replies': post.get('replies', 0),
+        'images': post.get('images', 0),
+        'thread_url': f"https://boards.4chan.org/{board}/thread/{thread_no}",
+        'post_url': f"https://boards.4chan.org/{board}/thread/{thread_no}#p{post.get('no')}",
+        'matched_keywords': matched_keywords
+    }
 
-def filter_posts_by_time_and_keywords(board, start_date, end_date, keywords):
-    """Main function to filter posts by time range and keywords"""
+def print_match(number, post_data):
+    """Console preview of a match"""
+    print(f"✓ Match #{number}: {post_data['matched_keywords']}")
+    print(f"  Thread: {post_data['thread_title'][:50]}...")
+    print(f"  Time: {post_data['human_time']}")
+    print(f"  Text preview: {post_data['post_text'][:100]}...")
+    print()
+
+def filter_posts_by_time_and_keywords(boards, start_date, end_date, keywords, max_workers=MAX_WORKERS,
+                                      state=None, sink=None, manifest=None):
+    """Main function to filter posts by time range and keywords
+    
+    boards is a board name or a list of them; several boards are crawled together on one worker
+    pool, taking turns for requests (see board_fanout.py). Matches are written to sink as they are
+    found (kept in memory when no sink is given) and the sink is returned. When a CrawlState is given,
+    only threads that changed since the previous run are downloaded. When a RunManifest is given,
+    threads it lists as done are skipped and each finished thread is recorded in it.
+    """
+    if sink is None:
+        sink = MemorySink()
+    if isinstance(boards, str):
+        boards = [boards]
+    boards = [board for board in boards if post_filter.accepts_board(board)]
     
-    print(f"Fetching posts from /{board}/...")
+    print(f"Fetching posts from {', '.join(f'/{board}/' for board in boards)}...")
     print(f"Time range: {start_date.strftime('%Y-%m-%d %H:%M:%S')} to {end_date.strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Keywords: {', '.join(keywords)}")
+    if post_filter.active:
+        print(f"Filters (checked before cleaning): {'; '.join(post_filter.describe())}")
     print("WARNING: Only currently active threads are available via 4chan API")
     print("Older posts may not be found if their threads were archived/deleted")
     print("="*80)
     
-    catalog = get_catalog(board)
-    if not catalog:
-        return []
+    # Catalogs of all boards at once
+    def load_catalog(board):
+        if state:
+            return fetch_json_if_modified(catalog_url(board), state.catalog_last_modified(board), schema="catalog")
+        return get_catalog(board), None
+    catalogs = dict(zip(boards, fetch_concurrently(load_catalog, boards, max_workers)))
+    
+    def done_key(board, thread_no):
+        # Thread numbers are only unique within a board
+        return thread_no if len(boards) == 1 else f"{board}/{thread_no}"
     
-    filtered_posts = []
     total_threads = 0
     checked_posts = 0
+    filtered_posts = 0
+    seen_before = 0
+    unchanged_threads = 0
+    outside_threads = 0
+    catalog_threads = {board: {} for board in boards}
+    thread_nos = {}
+    download_queues = {}
     
     # Convert datetime to Unix timestamps for comparison
     start_timestamp = int(start_date.timestamp())
     end_timestamp = int(end_date.timestamp())
     
-    # Go through each page in the catalog
-    for page in catalog:
-        for thread in page.get('threads', []):
-            total_threads += 1
-            thread_no = thread.get('no')
-            
-            # Check if the original post (OP) is in our time range
-            thread_time = thread.get('time', 0)
-            
-            if start_timestamp <= thread_time <= end_timestamp:
-                # Get the full thread to check all posts
-                thread_data = get_thread_posts(board, thread_no)
+    # Go through each page of every catalog and pick the threads to download
+    for board, (catalog, _) in catalogs.items():
+        if catalog is NOT_MODIFIED:
+            print(f"/{board}/ catalog unchanged since the last run, nothing new to check")
+            continue
+        if not catalog:
+            continue
+        board_threads = thread_nos[board] = []
+        for page in catalog:
+            for thread in page.get('threads', []):
+                total_threads += 1
+                thread_no = thread.get('no')
+                catalog_threads[board][thread_no] = thread
                 
-                if thread_data and 'posts' in thread_data:
-                    for post in thread_data['posts']:
-                        checked_posts += 1
-                        post_time = post.get('time', 0)
-                        
-                        # Check if post is in time range
-                        if start_timestamp <= post_time <= end_timestamp:
-                            # Clean and check post content
-                            post_text = clean_html(post.get('com', ''))
-                            thread_title = clean_html(post.get('sub', ''))
-                            
-                            # Combine title and text for keyword searching
-                            full_text = f"{thread_title} {post_text}"
-                            
-                            # Check for keywords
-                            matched_keywords = check_keywords(full_text, keywords)
-                            
-                            if matched_keywords:
-                                post_data = {
-                                    'board': board,
-                                    'thread_no': thread_no,
-                                    'post_no': post.get('no'),
-                                    'thread_title': thread_title or "No Title",
-                                    'post_text': post_text,
-                                    'poster_name': post.get('name', 'Anonymous'),
-                                    'poster_id': post.get('id', ''),
-                                    'timestamp': post_time,
-                                    'human_time': format_timestamp(post_time),
-                                    'replies': post.get('replies', 0),
-                                    'images': post.get('images', 0),
-                                    'thread_url': f"https://boards.4chan.org/{board}/thread/{thread_no}",
-                                    'post_url': f"https://boards.4chan.org/{board}/thread/{thread_no}#p{post.get('no')}",
-                                    'matched_keywords': matched_keywords
-                                }
-                                
-                                filtered_posts.append(post_data)
-                                
-                                print(f"✓ Match #{len(filtered_posts)}: {matched_keywords}")
-                                print(f"  Thread: {post_data['thread_title'][:50]}...")
-                                print(f"  Time: {post_data['human_time']}")
-                                print(f"  Text preview: {post_text[:100]}...")
-                                print()
+                # Only threads started before the window ends and replied to after it starts
+                # (an old thread with fresh replies counts, a thread that went quiet does not)
+                if not thread_overlaps(thread, start_timestamp, end_timestamp):
+                    outside_threads += 1
+                    continue
+                # Skip threads whose last_modified and reply count match the previous run
+                if state and not state.is_changed(board, thread):
+                    unchanged_threads += 1
+                    continue
+                # Already finished by the interrupted run we are resuming
+                if manifest and manifest.is_done(done_key(board, thread_no)):
+                    continue
+                board_threads.append(thread_no)
+        # Each board's threads are requested most recently bumped first
+        download_queues[board] = sorted(board_threads, key=lambda no: thread_priority(catalog_threads[board][no]))
+    
+    # Get the full threads in parallel, then handle them in catalog order
+    to_download = sum(len(queue) for queue in download_queues.values())
+    print(f"Downloading {to_download} threads with {max_workers} workers...")
+    
+    def download(board, thread_no, rank):
+        # The position in its board's queue is the request priority: boards take turns
+        if state:
+            result = fetch_json_if_modified(thread_url(board, thread_no), state.thread_last_modified(board, thread_no),
+                                            priority=rank, schema="thread")
+        else:
+            result = get_thread_posts(board, thread_no, rank)
+        metrics.count("threads")
+        metrics.progress(to_download)
+        return result
+    
+    downloaded = fetch_fair(download, download_queues, max_workers)
+    board_matches = {}
+    
+    for board, board_threads in thread_nos.items():
+        by_thread = dict(zip(download_queues[board], downloaded[board]))
+        if state:
+            responses = [by_thread[no] for no in board_threads]
+            threads_data = [None if data is NOT_MODIFIED else data for data, _ in responses]
+        else:
+            threads_data = [by_thread[no] for no in board_threads]
+        matches_before = sink.count
+        
+        for thread_no, thread_data in zip(board_threads, threads_data):
+            if thread_data and 'posts' in thread_data:
+                if post_store:
+                    post_store.add_api_posts(board, thread_no, thread_data['posts'])
+                # Posts are in time order: only the slice inside the time range is cleaned and matched
+                for post in posts_in_window(thread_data['posts'], start_timestamp, end_timestamp):
+                    checked_posts += 1
+                    # Checked by an earlier run: its match (if any) was already reported
+                    if seen_posts:
+                        if seen_posts.seen(board, post.get('no', 0)):
+                            seen_before += 1
+                            continue
+                        seen_posts.stage(board, post.get('no', 0))
+                    # Metadata filters on the raw post, before any cleaning
+                    if not post_filter(post):
+                        filtered_posts += 1
+                        continue
+                    post_data = match_post(board, thread_no, post, keywords)
+                    
+                    if post_data:
+                        with metrics.timer("write"):
+                            sink.write(post_data)
+                        metrics.count("matches")
+                        if VERBOSE:
+                            print_match(sink.count, post_data)
+                metrics.count("posts", len(thread_data['posts']))
+            
+            saved = not manifest
+            if manifest and thread_data:
+                if post_store:
+                    post_store.flush()
+                with metrics.timer("write"):
+                    saved = manifest.mark_done(done_key(board, thread_no), sink)
+            # Only once the manifest is saved are the threads' matches safe from being cut off on resume
+            if seen_posts:
+                seen_posts.keep()
+                if saved:
+                    seen_posts.commit()
+            metrics.progress(to_download)
+        board_matches[board] = sink.count - matches_before
+        
+        if state:
+            # Only record threads that were actually read, failed downloads are retried next run
+            for thread_no, thread_data, (data, http_last_modified) in zip(board_threads, threads_data, responses):
+                if thread_data or data is NOT_MODIFIED:
+                    state.record_thread(board, catalog_threads[board][thread_no], http_last_modified)
+            state.forget_missing(board, catalog_threads[board])
+            state.set_catalog_last_modified(board, catalogs[board][1])
+    
+    if state:
+        state.save()
     
     print("="*80)
     print(f"RESULTS:")
     print(f"Total threads checked: {total_threads}")
-    print(f"Total posts checked: {checked_posts}")
-    print(f"Posts matching criteria: {len(filtered_posts)}")
+    print(f"Threads without posts in the time range (skipped): {outside_threads}")
+    if state:
+        print(f"Threads unchanged since last run (skipped): {unchanged_threads}")
+    print(f"Posts in the time range checked: {checked_posts}")
+    if seen_posts:
+        print(f"Posts already checked by an earlier run (skipped): {seen_before}")
+    if post_filter.active:
+        print(f"Posts rejected by the filters (never cleaned): {filtered_posts}")
+    print(f"Posts matching criteria: {sink.count}")
+    if len(boards) > 1:
+        for board in boards:
+            print(f"  /{board}/: {board_matches.get(board, 0)} matches")
+    metrics.print_summary()
     
-    return filtered_posts
+    return sink
 
-def save_results(filtered_posts, board):
-    """Save filtered posts to JSON and text files"""
-    if not filtered_posts:
-        print("\n✗ No matches found with current criteria")
-        return
+def scan_catalog(catalog, tracker, baseline):
+    """New posts in a watched board's catalog: (posts already in the catalog, threads to download)
+    
+    tracker holds what previous polls saw of the board. On the baseline poll everything
+    currently on the board counts as seen.
+    """
+    last_seen = tracker['last_seen']        # thread number -> highest post number already processed
+    reply_counts = tracker['reply_counts']  # thread number -> reply count at the previous poll
+    new_posts = []
+    to_fetch = {}
+    live_threads = set()
+    
+    for page in catalog:
+        for thread in page.get('threads', []):
+            thread_no = thread.get('no')
+            live_threads.add(thread_no)
+            preview = thread.get('last_replies', [])
+            replies = thread.get('replies', 0)
+            
+            if baseline:
+                last_seen[thread_no] = max([thread_no] + [reply.get('no', 0) for reply in preview])
+                reply_counts[thread_no] = replies
+                continue
+            
+            seen = last_seen.get(thread_no, 0)
+            candidates = [thread] if thread_no > seen else []
+            candidates += [reply for reply in preview if reply.get('no', 0) > seen]
+            new_replies = replies - reply_counts.get(thread_no, 0)
+            
+            if new_replies > len(candidates) - (thread_no > seen):
+                # More new replies than the catalog preview holds: download the thread
+                to_fetch[thread_no] = replies
+            else:
+                new_posts.extend((thread_no, post) for post in candidates)
+                reply_counts[thread_no] = replies
     
-    # Create output directory
-    output_dir = "output_official_api"
-    os.makedirs(output_dir, exist_ok=True)
+    # Forget threads that fell off the board
+    for thread_no in [no for no in last_seen if no not in live_threads]:
+        last_seen.pop(thread_no, None)
+        reply_counts.pop(thread_no, None)
+        tracker['thread_modified'].pop(thread_no, None)
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return new_posts, to_fetch
+
+def watch_board(boards, keywords, sink, poll_interval=POLL_INTERVAL, max_workers=MAX_WORKERS,
+                backfill=WATCH_BACKFILL):
+    """Long-running mode: poll the catalog and only clean and match posts not seen before
     
-    # Save to JSON
-    json_filename = os.path.join(output_dir, f'{board}_filtered_raw_{timestamp}.json')
-    with open(json_filename, 'w', encoding='utf-8') as f:
-        json.dump(filtered_posts, f, indent=2, ensure_ascii=False)
+    The catalog already contains each thread's last five replies, so a thread is only
+    downloaded when more replies arrived since the previous poll than the catalog shows.
+    boards is a board name or a list of them, polled together on one worker pool.
+    """
+    if isinstance(boards, str):
+        boards = [boards]
+    boards = [board for board in boards if post_filter.accepts_board(board)]
+    print(f"Watching {', '.join(f'/{board}/' for board in boards)} every {poll_interval}s for: {', '.join(keywords)}")
+    print("Press Ctrl+C to stop")
+    print("="*80)
     
-    # Save to readable text
-    txt_filename = os.path.join(output_dir, f'{board}_filtered_raw_{timestamp}.txt')
-    with open(txt_filename, 'w', encoding='utf-8') as f:
-        f.write(f"4chan /{board}/ Filtered Posts\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Time Range: {START_DATE.strftime('%Y-%m-%d %H:%M:%S')} to {END_DATE.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Keywords: {', '.join(KEYWORDS)}\n")
-        f.write(f"Total Matches: {len(filtered_posts)}\n")
-        f.write("="*80 + "\n\n")
+    trackers = {board: {'last_seen': {}, 'reply_counts': {}, 'thread_modified': {}, 'catalog_modified': None,
+                        'baselined': backfill}
+                for board in boards}
+    
+    while True:
+        poll_started = time.time()
+        catalogs = fetch_concurrently(
+            lambda board: fetch_json_if_modified(catalog_url(board), trackers[board]['catalog_modified'],
+                                                 schema="catalog"),
+            boards, max_workers)
+        
+        new_posts = {}
+        to_fetch = {}
+        baselined = []
+        for board, (catalog, header) in zip(boards, catalogs):
+            if not catalog or catalog is NOT_MODIFIED:
+                continue
+            tracker = trackers[board]
+            tracker['catalog_modified'] = header
+            new_posts[board], to_fetch[board] = scan_catalog(catalog, tracker, not tracker['baselined'])
+            if not tracker['baselined']:
+                tracker['baselined'] = True
+                baselined.append(board)
+        
+        # Threads of all boards share the pool, taking turns board by board
+        responses = fetch_fair(
+            lambda board, no, rank: fetch_json_if_modified(thread_url(board, no),
+                                                           trackers[board]['thread_modified'].get(no),
+                                                           priority=rank, schema="thread"),
+            {board: list(threads) for board, threads in to_fetch.items()}, max_workers)
+        for board, board_responses in responses.items():
+            tracker = trackers[board]
+            for thread_no, (thread_data, modified) in zip(to_fetch[board], board_responses):
+                if not thread_data or thread_data is NOT_MODIFIED:
+                    continue
+                tracker['thread_modified'][thread_no] = modified
+                tracker['reply_counts'][thread_no] = to_fetch[board][thread_no]
+                seen = tracker['last_seen'].get(thread_no, 0)
+                new_posts[board].extend((thread_no, post) for post in thread_data.get('posts', [])
+                                        if post.get('no', 0) > seen)
+        
+        downloaded = sum(len(threads) for threads in to_fetch.values())
+        new_count = sum(len(posts) for posts in new_posts.values())
+        metrics.count("threads", downloaded)
+        metrics.count("posts", new_count)
         
-        for i, post in enumerate(filtered_posts, 1):
-            f.write(f"POST #{i} - Keywords: {', '.join(post['matched_keywords'])}\n")
-            f.write("="*80 + "\n")
-            f.write(f"Thread: {post['thread_title']}\n")
-            f.write(f"Time: {post['human_time']}\n")
-            f.write(f"Poster: {post['poster_name']}")
-            if post['poster_id']:
-                f.write(f" (ID: {post['poster_id']})")
-            f.write(f"\nURL: {post['post_url']}\n")
-            f.write(f"Replies: {post['replies']}, Images: {post['images']}\n")
-            f.write("-" * 40 + "\n")
-            f.write(f"{post['post_text']}\n")
-            f.write("\n" + "="*80 + "\n\n")
+        # Clean and match only the new posts, writing each match out immediately
+        matches_before = sink.count
+        for board, board_posts in new_posts.items():
+            last_seen = trackers[board]['last_seen']
+            if post_store:
+                for thread_no, post in board_posts:
+                    post_store.add_api_posts(board, thread_no, [post])
+                post_store.flush()
+            for thread_no, post in board_posts:
+                last_seen[thread_no] = max(last_seen.get(thread_no, 0), post.get('no', 0))
+                # Checked before this watch started (see SKIP_SEEN_POSTS)
+                if seen_posts:
+                    if seen_posts.seen(board, post.get('no', 0)):
+                        continue
+                post_data = match_post(board, thread_no, post, keywords) if post_filter(post) else None
+                if post_data:
+                    with metrics.timer("write"):
+                        sink.write(post_data)
+                        sink.flush()
+                    metrics.count("matches")
+                    print_match(sink.count, post_data)
+                # Marked only after its match is on disk
+                if seen_posts:
+                    seen_posts.add(board, post.get('no', 0))
+        if seen_posts:
+            seen_posts.save()
+        
+        if baselined:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Tracking "
+                  + ", ".join(f"{len(trackers[board]['last_seen'])} threads on /{board}/" for board in baselined))
+        if len(baselined) < len(new_posts):
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {new_count} new posts, "
+                  f"{downloaded} threads downloaded, {sink.count - matches_before} new matches "
+                  f"({sink.count} total)")
+        
+        time.sleep(max(0, poll_interval - (time.time() - poll_started)))
+
+def format_post(i, post):
+    """Readable text block for one matched post"""
+    lines = [
+        f"POST #{i} - Keywords: {', '.join(post['matched_keywords'])}\n",
+        "="*80 + "\n",
+        f"Thread: {post['thread_title']}\n",
+        f"Time: {post['human_time']}\n",
+        f"Poster: {post['poster_name']}",
+    ]
+    if post['poster_id']:
+        lines.append(f" (ID: {post['poster_id']})")
+    lines.append(f"\nURL: {post['post_url']}\n")
+    lines.append(f"Replies: {post['replies']}, Images: {post['images']}\n")
+    lines.append("-" * 40 + "\n")
+    lines.append(f"{post['post_text']}\n")
+    lines.append("\n" + "="*80 + "\n\n")
+    return ''.join(lines)
+
+def save_results(sink, boards):
+    """Write the readable text report from the streamed JSONL output"""
+    if not sink.count:
+        print("\n✗ No matches found with current criteria")
+        return
+    
+    header = (
+        f"4chan {', '.join(f'/{board}/' for board in boards)} Filtered Posts\n"
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"Time Range: {START_DATE.strftime('%Y-%m-%d %H:%M:%S')} to {END_DATE.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"Keywords: {', '.join(KEYWORDS)}\n"
+        f"Total Matches: {sink.count}\n"
+        + "="*80 + "\n\n"
+    )
+    txt_filename = report_path(sink.path)
+    write_text_report(sink.path, txt_filename, header, format_post)
     
-    print(f"\n✓ Saved {len(filtered_posts)} posts to:")
-    print(f"  JSON: {json_filename}")
+    print(f"\n✓ Saved {sink.count} posts to:")
+    print(f"  JSONL: {sink.path}")
     print(f"  Text: {txt_filename}")
 
 # ============================================================================
@@ -262,10 +556,52 @@ if __name__ == "__main__":
     print("4chan API Raw Scraper")
     print("="*80)
     
-    # Run the filtering
-    results = filter_posts_by_time_and_keywords(BOARD, START_DATE, END_DATE, KEYWORDS)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    
+    if WATCH_MODE:
+        # Matches are flushed to disk one by one while watching
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = ".jsonl.gz" if COMPRESS_OUTPUT else ".jsonl"
+        sink = JsonlSink(os.path.join(OUTPUT_DIR, f"{board_label(RUN_BOARDS)}_watch_{timestamp}{extension}"),
+                         compress=COMPRESS_OUTPUT, flush_every=1)
+        if METRICS_PORT:
+            serve_metrics(METRICS_PORT)
+        try:
+            watch_board(RUN_BOARDS, KEYWORDS, sink)
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+        finally:
+            sink.close()
+            if seen_posts:
+                seen_posts.save()
+            if post_store:
+                post_store.close()
+    else:
+        # Run the filtering
+        state = CrawlState(STATE_FILE) if INCREMENTAL else None
+        manifest = RunManifest(MANIFEST_FILE)
+        sink = manifest.open_sink(OUTPUT_DIR, f"{board_label(RUN_BOARDS)}_filtered_raw", compress=COMPRESS_OUTPUT)
+        
+        try:
+            filter_posts_by_time_and_keywords(RUN_BOARDS, START_DATE, END_DATE, KEYWORDS,
+                                              state=state, sink=sink, manifest=manifest)
+            manifest.finish(sink)
+            metrics.save_summary(report_path(sink.path, '_metrics.json'))
+        finally:
+            sink.close()
+            # Threads finished since the last periodic save, also after a failure or Ctrl+C
+            manifest.save()
+            # Holds only posts of threads recorded as finished in the saved manifest,
+            # whose matches survive a resume, so it is saved even after a failure
+            if seen_posts:
+                seen_posts.commit()
+                seen_posts.save()
+            if thread_cache:
+                thread_cache.save()
+            if post_store:
+                post_store.close()
     
     # Save results
-    save_results(results, BOARD)
+    save_results(sink, RUN_BOARDS)
     
     print("\n✓ Script completed!")
\ No newline at end of file
@@ -1,41 +1,82 @@
 from pychan import FourChan, LogLevel, PychanLogger
 from datetime import datetime, timezone
-import json
+from keyword_matcher import KeywordMatcher
+from request_scheduler import schedule_pychan
+from result_sink import RunManifest, write_text_report, report_path
+from run_metrics import get_metrics
+from seen_index import SeenIndex, settings_signature
 
 # Initialize pychan
 logger = PychanLogger(LogLevel.INFO)
 fourchan = FourChan(logger=logger, raise_http_exceptions=False)
 
+# Pace pychan's requests with the shared scheduler (per-host rate limit, backoff on 429/5xx)
+schedule_pychan(fourchan)
+
 # Simple keyword list
 keywords = ["trump", "election", "vote", "biden", "government", "president", "policy", "democrat", "republican"]
 
+# Only match whole words ("vote" will no longer match "devoted", but also not "votes")
+whole_word = False
+
+# Compile the keyword list once, every post is then scanned in a single pass
+matcher = KeywordMatcher(keywords, whole_word=whole_word)
+
 # Just get posts from today
 start_date = datetime(2025, 10, 20, tzinfo=timezone.utc)
 end_date = datetime(2025, 10, 21, tzinfo=timezone.utc)
 
-filtered_posts = []
+# Matches are streamed to a JSON Lines file as they are found. The manifest
+# records finished threads, so an interrupted run is resumed by the next run.
+compress_output = False  # True writes .jsonl.gz instead of .jsonl
+manifest = RunManifest("pol_run_manifest.json")
+sink = manifest.open_sink("", "pol_filtered", compress=compress_output)
+
+# Skip posts an earlier run already checked, so back-to-back runs only report new
+# matches. Post numbers are remembered per board in "seen_posts" (see seen_index.py);
+# changing the keywords starts the index over.
+skip_seen_posts = False
+seen_posts = SeenIndex("seen_posts", settings_signature(keywords, whole_word)) if skip_seen_posts else None
+
+# Print every match as it is found (slow with thousands of matches). Otherwise a
+# progress line is printed every few seconds and a timing summary at the end.
+verbose = False
+metrics = get_metrics()
+
 total_posts = 0
 posts_today = 0
+seen_before = 0
 
 print("Fetching posts from /pol/...\n")
 
-for thread in fourchan.get_threads("pol"):
+threads = fourchan.get_threads("pol")
+for thread in threads:
+    # Already finished by the interrupted run we are resuming
+    if manifest.is_done(thread.number):
+        continue
+    
     try:
-        for post in fourchan.get_posts(thread):
+        # "parse" is pychan's HTML parsing, the download inside is timed separately as "fetch"
+        with metrics.timer("parse"):
+            posts = fourchan.get_posts(thread)
+        metrics.count("posts", len(posts))
+        for post in posts:
             total_posts += 1
             
             # Check if post is from today
             if post.timestamp >= start_date and post.timestamp < end_date:
                 posts_today += 1
                 
-                # Convert to lowercase for matching
-                text_lower = post.text.lower()
+                # Checked by an earlier run: its match (if any) was already reported
+                if seen_posts:
+                    if seen_posts.seen(post.thread.board, post.number):
+                        seen_before += 1
+                        continue
+                    seen_posts.stage(post.thread.board, post.number)
                 
-                # Check each keyword
-                matched = []
-                for keyword in keywords:
-                    if keyword.lower() in text_lower:
-                        matched.append(keyword)
+                # Match all keywords in one pass
+                with metrics.timer("match"):
+                    matched = matcher.match(post.text)
                 
                 # If we found matches, save the post
                 if matched:
@@ -55,39 +96,73 @@ for thread in fourchan.get_threads("pol"):
                         'text': post.text,
                         'matched_keywords': matched
                     }
-                    filtered_posts.append(post_data)
+                    with metrics.timer("write"):
+                        sink.write(post_data)
+                    metrics.count("matches")
                     
-                    print(f"✓ Match #{len(filtered_posts)}: {matched}")
-                    print(f"  Text preview: {post.text[:150]}...\n")
+                    if verbose:
+                        print(f"✓ Match #{sink.count}: {matched}")
+                        print(f"  Text preview: {post.text[:150]}...\n")
+        
+        with metrics.timer("write"):
+            saved = manifest.mark_done(thread.number, sink)
+        # Once the manifest is saved the thread's matches are safe, its posts count as seen
+        if seen_posts:
+            seen_posts.keep()
+            if saved:
+                seen_posts.commit()
+        metrics.count("threads")
+        metrics.progress(len(threads))
+    
+    except KeyboardInterrupt:
+        # Keep the threads finished since the last save, the next run resumes after them
+        manifest.save()
+        if seen_posts:
+            seen_posts.commit()
+            seen_posts.save()
+        raise
     
     except Exception as e:
         print(f"Error: {e}")
+        # Checked again by the next run
+        if seen_posts:
+            seen_posts.discard()
         continue
 
+manifest.finish(sink)
+sink.close()
+if seen_posts:
+    seen_posts.commit()
+    seen_posts.save()
+
 print(f"\n{'='*80}")
 print(f"RESULTS:")
 print(f"Total posts checked: {total_posts}")
 print(f"Posts from Oct 20: {posts_today}")
-print(f"Posts with keywords: {len(filtered_posts)}")
+if seen_posts:
+    print(f"Posts already checked by an earlier run (skipped): {seen_before}")
+print(f"Posts with keywords: {sink.count}")
+metrics.print_summary()
+metrics.save_summary(report_path(sink.path, '_metrics.json'))
 
-if filtered_posts:
-    # Save to JSON
-    filename = f'pol_filtered_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(filtered_posts, f, indent=2, ensure_ascii=False)
-    
-    # Save to readable text
-    txt_filename = f'pol_filtered_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
-    with open(txt_filename, 'w', encoding='utf-8') as f:
-        for i, post in enumerate(filtered_posts, 1):
-            f.write(f"\n{'='*80}\n")
-            f.write(f"POST #{i} - Keywords: {', '.join(post['matched_keywords'])}\n")
-            f.write(f"{'='*80}\n")
-            f.write(f"Thread: {post['thread_title']}\n")
-            f.write(f"Time: {post['timestamp']}\n")
-            f.write(f"Poster: {post['poster_name']}\n")
-            f.write(f"URL: {post['post_url']}\n")
-            f.write(f"\n{post['text']}\n")
+def format_post(i, post):
+    """Readable text block for one matched post"""
+    return (
+        f"\n{'='*80}\n"
+        f"POST #{i} - Keywords: {', '.join(post['matched_keywords'])}\n"
+        f"{'='*80}\n"
+        f"Thread: {post['thread_title']}\n"
+        f"Time: {post['timestamp']}\n"
+        f"Poster: {post['poster_name']}\n"
+        f"URL: {post['post_url']}\n"
+        f"\n{post['text']}\n"
+    )
+
+if sink.count:
+    # Save readable text, streamed from the JSONL output
+    filename = sink.path
+    txt_filename = report_path(filename)
+    write_text_report(filename, txt_filename, "", format_post)
     
     print(f"\n✓ Saved to {filename}")
     print(f"✓ Saved readable version to {txt_filename}")
@@ -1,177 +1,394 @@
-from pychan import FourChan, LogLevel, PychanLogger
 from datetime import datetime, timezone
-import json
+from keyword_matcher import KeywordMatcher
+from request_scheduler import schedule_pychan, get_scheduler
+from api_backend import get_thread, thread_records, pychan_record, match_record
+from result_sink import RunManifest, read_jsonl, write_text_report, report_path
+from response_cache import ResponseCache
+from archive_index import ArchiveIndex
+from post_store import PostStore
+from post_filter import PostFilter, API_FIELDS, RECORD_FIELDS
+from stream_stats import PostStats
+from media_downloader import MediaDownloader
+from run_metrics import get_metrics
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import os
+import time
 
-# Initialize pychan
-logger = PychanLogger(LogLevel.INFO)
-fourchan = FourChan(logger=logger, raise_http_exceptions=False)
+# pychan is only needed for backend = "pychan"
+try:
+    from pychan import FourChan, LogLevel, PychanLogger
+    from pychan.models import Thread
+except ImportError:
+    FourChan = None
 
 # Simple keyword list
 keywords = ["immigrants", "border", "refugees", "asylum", "migration", "illegal", "visa", "citizenship", "deportation"]
 
+# Only match whole words ("visa" will no longer match "visage", but also not "visas")
+whole_word = False
+
+# Compile the keyword list once, every post is then scanned in a single pass
+matcher = KeywordMatcher(keywords, whole_word=whole_word)
+
+# Where threads come from:
+#   "official" - the official JSON API (archive.json + thread JSON): concurrent, cached, no HTML parsing
+#   "pychan"   - pychan scraping the archive and thread HTML pages (the original approach)
+# Both produce the same output fields.
+backend = "official"
+
 # Configuration
 board = "pol"  # Board to search
 max_threads = 800 # real maximum: 3000 # Limit threads to process (archived threads can be numerous)
 
+# Crawler settings
+workers = 4             # Threads downloaded and parsed at the same time
+time_budget = None      # Stop after this many seconds (None = no limit), e.g. 30 * 60
+request_budget = None   # Stop after this many thread downloads (None = no limit)
+# When a budget stops the run, the next run continues with the remaining threads
+
+# Only process archived threads that no earlier run has processed yet
+# (keep False when re-running the same threads with other keywords or countries)
+skip_seen_threads = False
+
 # Optional country filter (set to None to disable)
 filter_country = "Denmark" # None # Set to None to include all countries, or specify country like "Denmark", "United States", etc.
 
+# More post filters (see post_filter.py), all checked on the raw post before its
+# text is cleaned or matched, e.g. {"has_file": True, "op_only": True},
+# {"poster_id": ["a1b2c3d4"]}, {"start": datetime(2025, 10, 20, tzinfo=timezone.utc)}
+# or {"country": ["Denmark", "Sweden"]} with filter_country = None
+filters = {}
+
+# Write .jsonl.gz instead of .jsonl
+compress_output = False
+
+# Download the files of matching posts into <output_dir>/media, each distinct
+# file only once: reposts are recognised by the md5 4chan publishes (see
+# media_downloader.py). Unfinished downloads continue on the next run.
+download_media = False
+media_thumbnails = False   # True downloads the small thumbnails instead of the full files
+media_byte_budget = None   # Stop downloading after this many bytes (None = no limit), e.g. 500 * 1024**2
+
+# Print every match and every thread as it is processed (slow with thousands of
+# matches). Otherwise a progress line is printed every few seconds and a timing
+# summary at the end, also saved as <output>_metrics.json.
+verbose = False
+metrics = get_metrics()
+
+if backend == "pychan":
+    if FourChan is None:
+        raise SystemExit('backend = "pychan" needs pychan: pip install pychan')
+    # Initialize pychan
+    logger = PychanLogger(LogLevel.INFO)
+    fourchan = FourChan(logger=logger, raise_http_exceptions=False)
+    
+    # Pace pychan's requests with the shared scheduler (per-host rate limit, backoff on 429/5xx)
+    schedule_pychan(fourchan)
+
+# The official backend filters raw API posts, pychan's posts are filtered as records
+post_filter = PostFilter({"country": filter_country, **filters},
+                         fields=API_FIELDS if backend == "official" else RECORD_FIELDS)
+
+# Archived threads never change, so their posts are cached locally after the
+# first download. Re-running with other keywords or another country is then
+# served from the cache instead of the network.
+use_cache = True
+cache = ResponseCache() if use_cache else None
+
+# Also store every post of every processed thread (all countries, not only
+# matches) in a SQLite database with a full-text index, for later searches
+# without crawling again (see query-post-store.py). None disables the store.
+post_store_path = None  # e.g. os.path.join("output_pychan_archived", f"{board}_posts.sqlite")
+post_store = PostStore(post_store_path) if post_store_path else None
+
 # Create output directory
 output_dir = "output_pychan_archived"
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
     print(f"Created output directory: {output_dir}")
 
-filtered_posts = []
+media = (MediaDownloader(os.path.join(output_dir, "media"), byte_budget=media_byte_budget,
+                         thumbnails=media_thumbnails) if download_media else None)
+
+# Matches are streamed to a JSON Lines file as they are found. The manifest
+# records finished threads, so an interrupted run is resumed by the next run.
+manifest = RunManifest(os.path.join(output_dir, f"{board}_archived_run_manifest.json"))
+sink = manifest.open_sink(output_dir, f"{board}_archived_filtered", compress=compress_output)
+
+# Statistics are updated as matches are written (saved as <output>_stats.json)
+stats = PostStats()
+if sink.count:
+    # Resumed run: count the matches the interrupted run already wrote, and
+    # finish their downloads (files already in the media index are skipped)
+    for post in read_jsonl(sink.path):
+        stats.add_record(post)
+        if media and post['has_file']:
+            media.add(post['thread_board'], post['post_number'], post['file_url'], post.get('file_md5'),
+                      post.get('file_size'))
+
 total_posts = 0
-total_threads = 0
-archived_threads_processed = 0
 
 print(f"Fetching archived threads from /{board}/...\n")
 if filter_country:
     print(f"Country filter: Only showing posts from {filter_country}")
 else:
     print("Country filter: Disabled (showing all countries)")
+if filters:
+    print(f"Post filters (checked in this order, before cleaning): {'; '.join(post_filter.describe())}")
 print("Note: This may take longer than live threads since we're processing archived content.\n")
 
-try:
-    for thread in fourchan.get_archived_threads(board):
-        total_threads += 1
-        archived_threads_processed += 1
+def get_archived_threads_with_retry(attempts=3):
+    """Archive listing, retried with a growing pause instead of giving up on the first error"""
+    for attempt in range(1, attempts + 1):
+        try:
+            threads = fourchan.get_archived_threads(board)
+            if threads:
+                return threads
+            print(f"Archive listing for /{board}/ came back empty (attempt {attempt}/{attempts})")
+        except Exception as e:
+            print(f"Error fetching archived threads (attempt {attempt}/{attempts}): {e}")
+        if attempt < attempts:
+            time.sleep(5 * attempt)
+    print("Note: Some boards (like /b/) don't have archives.")
+    return []
+
+def fetch_thread(thread_no):
+    """Download and parse one archived thread (runs on a worker), cache first
+
+    Returns the thread's records (see api_backend.py), the raw thread (API JSON or
+    pychan posts, for the post store) and whether it was downloaded.
+    """
+    # Newest archived threads get the first tokens when workers compete
+    with get_scheduler().priority(-thread_no):
+        if backend == "official":
+            thread_data, downloaded = get_thread(board, thread_no, cache=cache)
+            if not thread_data:
+                raise ValueError("thread could not be downloaded")
+            with metrics.timer("clean"):
+                return thread_records(board, thread_no, thread_data, keep=post_filter), thread_data, downloaded
         
-        # Limit processing to avoid excessive runtime
-        if archived_threads_processed > max_threads:
-            print(f"Reached maximum thread limit ({max_threads}). Stopping...")
-            break
+        posts = cache.get(board, thread_no, kind="pychan") if cache else None
+        downloaded = posts is None
+        if downloaded:
+            # "parse" is pychan's HTML parsing, the download inside is timed separately as "fetch"
+            with metrics.timer("parse"):
+                posts = fourchan.get_posts(Thread(board, thread_no, is_archived=True))
+            if cache and posts:
+                cache.put(board, thread_no, posts, immutable=True, kind="pychan")
+        records = [pychan_record(post) for post in posts]
+        if post_filter.active:
+            records = [record for record in records if post_filter(record)]
+        return records, posts, downloaded
+
+def process_posts(records):
+    """Match the posts of one thread that passed the filters, writing matches to the sink"""
+    for record in records:
+        # Match all keywords in one pass
+        with metrics.timer("match"):
+            matched = matcher.match(record['text'])
+        
+        # If we found matches, save the post
+        if matched:
+            post_data = match_record(record, matched)
+            with metrics.timer("write"):
+                sink.write(post_data)
+                stats.add_record(post_data)
+            metrics.count("matches")
+            if media and record['has_file']:
+                media.add(record['thread_board'], record['post_number'], record['file_url'],
+                          record['file_md5'], record['file_size'])
             
-        print(f"Processing archived thread #{archived_threads_processed}: {thread.title[:50]}..." if thread.title else f"Processing archived thread #{archived_threads_processed}")
+            if verbose:
+                country_info = f" from {record['poster_flag']}" if record['poster_flag'] else " (no flag)"
+                print(f"✓ Match #{sink.count}: {matched} in archived thread{country_info}")
+                print(f"  Thread: {record['thread_title'][:50] if record['thread_title'] else 'No title'}...")
+                print(f"  Text preview: {record['text'][:100]}...\n")
+
+# The archive listing comes from the local archive index: one request for the
+# official archive.json instead of pychan's archive page
+archive_index = ArchiveIndex(board)
+if archive_index.refresh():
+    print(f"Archive index: {archive_index.count} threads, {len(archive_index.new_threads)} newly archived since last run")
+    archived_threads = archive_index.unseen() if skip_seen_threads else archive_index.threads[::-1]
+elif backend == "pychan":
+    print("Archive index unavailable, falling back to pychan's archive listing")
+    archived_threads = [thread.number for thread in get_archived_threads_with_retry()]
+    if skip_seen_threads:
+        archived_threads = [thread_no for thread_no in archived_threads if not archive_index.is_seen(thread_no)]
+else:
+    print("Archive index unavailable (archive.json could not be downloaded)")
+    print("Note: Some boards (like /b/) don't have archives.")
+    archived_threads = []
+
+if not post_filter.accepts_board(board):
+    print(f"/{board}/ is excluded by the board filter, nothing to do")
+    archived_threads = []
+
+# Threads still to do: first max_threads of the archive, minus what a resumed run already finished
+total_threads = len(archived_threads)
+if max_threads and total_threads > max_threads:
+    print(f"Limiting to the first {max_threads} of {total_threads} archived threads")
+    archived_threads = archived_threads[:max_threads]
+pending = [thread_no for thread_no in archived_threads if not manifest.is_done(thread_no)]
+archived_threads_processed = len(archived_threads) - len(pending)
+print(f"{len(pending)} archived threads to process with {workers} workers\n")
+
+started = time.time()
+downloads = 0
+budget_reached = False
+
+# Threads are submitted a few at a time so a budget stops new work quickly,
+# and results are handled in archive order as they complete
+with ThreadPoolExecutor(max_workers=workers) as executor:
+    queue = deque()
+    next_index = 0
+    while next_index < len(pending) or queue:
+        while next_index < len(pending) and len(queue) < workers * 2 and not budget_reached:
+            if time_budget is not None and time.time() - started >= time_budget:
+                print(f"Time budget of {time_budget}s reached. Stopping...")
+                budget_reached = True
+                break
+            if request_budget is not None and downloads + len(queue) >= request_budget:
+                print(f"Request budget of {request_budget} downloads reached. Stopping...")
+                budget_reached = True
+                break
+            thread_no = pending[next_index]
+            queue.append((thread_no, executor.submit(fetch_thread, thread_no)))
+            next_index += 1
+        if not queue:
+            break
         
-        try:
-            for post in fourchan.get_posts(thread):
-                total_posts += 1
-                
-                # Optional country filter
-                if filter_country and post.poster.flag != filter_country:
-                    continue
-                
-                # Convert to lowercase for matching
-                text_lower = post.text.lower()
-                
-                # Check each keyword
-                matched = []
-                for keyword in keywords:
-                    if keyword.lower() in text_lower:
-                        matched.append(keyword)
-                
-                # If we found matches, save the post
-                if matched:
-                    # Build URLs manually
-                    thread_url = f"https://boards.4chan.org/{post.thread.board}/thread/{post.thread.number}"
-                    post_url = f"https://boards.4chan.org/{post.thread.board}/thread/{post.thread.number}#p{post.number}"
-                    
-                    post_data = {
-                        'thread_title': post.thread.title if post.thread.title else "No Title",
-                        'thread_board': post.thread.board,
-                        'thread_number': post.thread.number,
-                        'thread_url': thread_url,
-                        'thread_is_archived': post.thread.is_archived,
-                        'post_number': post.number,
-                        'post_url': post_url,
-                        'timestamp': str(post.timestamp),
-                        'poster_name': post.poster.name,
-                        'poster_id': post.poster.id if post.poster.id else "No ID",
-                        'poster_flag': post.poster.flag if post.poster.flag else "No Flag",
-                        'text': post.text,
-                        'matched_keywords': matched,
-                        'is_original_post': post.is_original_post,
-                        'has_file': post.file is not None,
-                        'file_url': post.file.url if post.file else None,
-                        'file_name': post.file.name if post.file else None
-                    }
-                    filtered_posts.append(post_data)
-                    
-                    country_info = f" from {post.poster.flag}" if post.poster.flag else " (no flag)"
-                    print(f"✓ Match #{len(filtered_posts)}: {matched} in archived thread{country_info}")
-                    print(f"  Thread: {post.thread.title[:50] if post.thread.title else 'No title'}...")
-                    print(f"  Text preview: {post.text[:100]}...\n")
+        thread_no, future = queue.popleft()
+        archived_threads_processed += 1
+        if verbose:
+            print(f"Processing archived thread #{archived_threads_processed}: {thread_no}")
         
+        try:
+            records, raw_thread, downloaded = future.result()
+            downloads += downloaded
+            # Every post counts as checked, also those the filters rejected before cleaning
+            post_count = len(raw_thread['posts']) if backend == "official" else len(raw_thread)
+            total_posts += post_count
+            metrics.count("posts", post_count)
+            process_posts(records)
+            if post_store:
+                if backend == "official":
+                    post_store.add_api_posts(board, thread_no, raw_thread['posts'])
+                else:
+                    post_store.add_pychan_posts(raw_thread)
+                post_store.flush()
+            # Checkpoint: this thread is finished even if the run is interrupted later
+            with metrics.timer("write"):
+                manifest.mark_done(thread_no, sink)
+            archive_index.mark_seen(thread_no)
+            metrics.count("threads")
+            metrics.progress(len(archived_threads))
+        except KeyboardInterrupt:
+            # Stop like a budget: the threads finished so far are saved below
+            print("Interrupted. Stopping...")
+            budget_reached = True
+            queue.clear()
+            break
         except Exception as e:
-            print(f"Error processing thread {thread.number}: {e}")
+            print(f"Error processing thread {thread_no}: {e}")
             continue
 
-except Exception as e:
-    print(f"Error fetching archived threads: {e}")
-    print("Note: Some boards (like /b/) don't have archives.")
+if budget_reached:
+    manifest.save()
+    left = sum(1 for thread_no in pending if not manifest.is_done(thread_no))
+    print(f"Run paused: {left} threads left, run the script again to continue")
+else:
+    manifest.finish(sink)
+sink.close()
+archive_index.save()
+if cache:
+    cache.save()
+if post_store:
+    post_store.close()
+if media:
+    media.close()
 
 print(f"\n{'='*80}")
 print(f"ARCHIVED THREADS RESULTS:")
 print(f"Total archived threads processed: {archived_threads_processed}")
 print(f"Total posts checked: {total_posts}")
-print(f"Posts with keywords: {len(filtered_posts)}")
+print(f"Posts with keywords: {sink.count}")
+if media:
+    media.print_summary()
+metrics.print_summary()
+metrics.save_summary(report_path(sink.path, '_metrics.json'))
+stats.save(report_path(sink.path, '_stats.json'))
 
-if filtered_posts:
-    # Save to JSON
-    filename = os.path.join(output_dir, f'{board}_archived_filtered_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(filtered_posts, f, indent=2, ensure_ascii=False)
-    
-    # Save to readable text
-    txt_filename = os.path.join(output_dir, f'{board}_archived_filtered_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt')
-    with open(txt_filename, 'w', encoding='utf-8') as f:
-        f.write(f"ARCHIVED THREADS ANALYSIS - /{board}/\n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Keywords: {', '.join(keywords)}\n")
-        f.write(f"Country filter: {filter_country if filter_country else 'All countries'}\n")
-        f.write(f"Threads processed: {archived_threads_processed}\n")
-        f.write(f"Total posts: {total_posts}\n")
-        f.write(f"Matching posts: {len(filtered_posts)}\n")
-        f.write(f"{'='*80}\n\n")
-        
-        for i, post in enumerate(filtered_posts, 1):
-            f.write(f"\n{'='*80}\n")
-            f.write(f"POST #{i} - Keywords: {', '.join(post['matched_keywords'])}\n")
-            f.write(f"{'='*80}\n")
-            f.write(f"Thread: {post['thread_title']}\n")
-            f.write(f"Thread #: {post['thread_number']} (Archived: {post['thread_is_archived']})\n")
-            f.write(f"Time: {post['timestamp']}\n")
-            f.write(f"Poster: {post['poster_name']}")
-            if post['poster_id'] != "No ID":
-                f.write(f" (ID: {post['poster_id']})")
-            if post['poster_flag'] != "No Flag":
-                f.write(f" ({post['poster_flag']})")
-            f.write(f"\n")
-            f.write(f"URL: {post['post_url']}\n")
-            f.write(f"Original Post: {post['is_original_post']}\n")
-            if post['has_file']:
-                f.write(f"File: {post['file_name']} ({post['file_url']})\n")
-            f.write(f"\n{post['text']}\n")
+def format_post(i, post):
+    """Readable text block for one matched post"""
+    lines = [
+        f"\n{'='*80}\n",
+        f"POST #{i} - Keywords: {', '.join(post['matched_keywords'])}\n",
+        f"{'='*80}\n",
+        f"Thread: {post['thread_title']}\n",
+        f"Thread #: {post['thread_number']} (Archived: {post['thread_is_archived']})\n",
+        f"Time: {post['timestamp']}\n",
+        f"Poster: {post['poster_name']}",
+    ]
+    if post['poster_id'] != "No ID":
+        lines.append(f" (ID: {post['poster_id']})")
+    if post['poster_flag'] != "No Flag":
+        lines.append(f" ({post['poster_flag']})")
+    lines.append(f"\n")
+    lines.append(f"URL: {post['post_url']}\n")
+    lines.append(f"Original Post: {post['is_original_post']}\n")
+    if post['has_file']:
+        lines.append(f"File: {post['file_name']} ({post['file_url']})\n")
+    lines.append(f"\n{post['text']}\n")
+    return ''.join(lines)
+
+if sink.count:
+    # Save readable text, streamed from the JSONL output
+    filename = sink.path
+    txt_filename = report_path(filename)
+    header = (
+        f"ARCHIVED THREADS ANALYSIS - /{board}/\n"
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"Keywords: {', '.join(keywords)}\n"
+        f"Country filter: {filter_country if filter_country else 'All countries'}\n"
+        + (f"Post filters: {'; '.join(post_filter.describe())}\n" if filters else "") +
+        f"Threads processed: {archived_threads_processed}\n"
+        f"Total posts: {total_posts}\n"
+        f"Matching posts: {sink.count}\n"
+        f"{'='*80}\n\n"
+    )
+    write_text_report(filename, txt_filename, header, format_post)
     
     print(f"\n✓ Saved to {filename}")
     print(f"✓ Saved readable version to {txt_filename}")
     
-    # Show some statistics
-    original_posts = sum(1 for post in filtered_posts if post['is_original_post'])
-    posts_with_files = sum(1 for post in filtered_posts if post['has_file'])
-    unique_threads = len(set(post['thread_number'] for post in filtered_posts))
-    
+    # Show some statistics (counted while the matches were written)
+    summary = stats.summary()
     print(f"\n📊 Additional Statistics:")
-    print(f"  Unique threads with matches: {unique_threads}")
-    print(f"  Original posts (thread starters): {original_posts}")
-    print(f"  Posts with files/images: {posts_with_files}")
+    print(f"  Unique threads with matches: {summary['distinct_threads']}")
+    print(f"  Original posts (thread starters): {summary['original_posts']}")
+    print(f"  Posts with files/images: {summary['posts_with_files']}")
+    print(f"  Distinct posters (approx.): {summary['distinct_posters']}")
     
     if filter_country:
-        country_posts = sum(1 for post in filtered_posts if post['poster_flag'] == filter_country)
+        country_posts = stats.countries.get(filter_country, 0)
         print(f"  Posts from {filter_country}: {country_posts}")
     else:
-        countries = {}
-        for post in filtered_posts:
-            flag = post['poster_flag'] if post['poster_flag'] != "No Flag" else "No Flag"
-            countries[flag] = countries.get(flag, 0) + 1
-        print(f"  Countries represented: {len(countries)}")
-        if len(countries) <= 10:  # Only show if not too many
-            for country, count in sorted(countries.items(), key=lambda x: x[1], reverse=True):
-                print(f"    {country}: {count} posts")
+        print(f"  Countries represented: {len(stats.countries)}")
+        for country, count in stats.top(stats.countries):
+            print(f"    {country}: {count} posts")
+    
+    print(f"  Top keywords:")
+    for keyword, count in stats.top(stats.keywords, 5):
+        print(f"    {keyword}: {count} posts")
+    if summary['top_threads']:
+        busiest = summary['top_threads'][0]
+        print(f"  Busiest thread: {busiest['thread']} ({busiest['matches']} matches)")
+    if stats.hours:
+        hour, count = stats.top(stats.hours, 1)[0]
+        print(f"  Busiest hour (UTC): {hour} ({count} matches)")
+    print(f"✓ Saved statistics to {report_path(filename, '_stats.json')}")
     
 else:
     print("\n✗ No matches found with current keywords in archived threads")
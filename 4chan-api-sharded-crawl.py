@@ -0,0 +1,298 @@
+from datetime import datetime
+import multiprocessing
+import os
+import time
+from api_backend import get_catalog, get_thread, thread_records, match_record
+from archive_index import ArchiveIndex
+from fourchan_fetch import reset_session
+from keyword_matcher import KeywordMatcher
+from post_filter import PostFilter
+from request_scheduler import share_rate
+from response_cache import ResponseCache
+from result_sink import JsonlSink, read_jsonl, report_path
+from stream_stats import PostStats
+from work_queue import WorkQueue, worker_name, IDLE_POLL
+
+# ============================================================================
+# CONFIGURATION - MODIFY THESE SETTINGS
+# ============================================================================
+
+# Keywords to search for (case-insensitive)
+KEYWORDS = ["immigrants", "border", "refugees", "asylum", "migration", "illegal", "visa", "citizenship", "deportation"]
+
+# Only match whole words ("visa" will no longer match "visage", but also not "visas")
+WHOLE_WORD = False
+
+# Post filters checked before cleaning (see post_filter.py), e.g. {"country": "Denmark"}
+FILTERS = {}
+
+# Board to search and where its threads come from:
+#   "archive" - every archived thread (archive.json)
+#   "catalog" - the threads currently on the board
+BOARD = "pol"
+SOURCE = "archive"
+MAX_THREADS = None  # Only the first N threads of the listing (None = all)
+
+# The threads are split into shards of SHARD_SIZE threads, kept as files in
+# QUEUE_DIR. WORKERS processes take shards from it until none are left, each
+# fetching, cleaning and matching on its own CPU core.
+SHARD_SIZE = 25
+WORKERS = os.cpu_count() or 4
+QUEUE_DIR = os.path.join("output_sharded", f"{BOARD}_queue")
+
+# What this run does:
+#   "all"    - fill the queue (unless it already holds a job), work on it, merge the results
+#   "worker" - only work on an existing queue, e.g. on another machine sharing QUEUE_DIR
+#   "merge"  - only merge the finished shards into one output file
+ROLE = "all"
+
+# Workers on all machines together. The request rate in request_scheduler.py
+# (HOST_LIMITS) is split between them, so they never exceed it together.
+# None = WORKERS (only this machine).
+TOTAL_WORKERS = None
+
+# Serve threads from the local cache when possible (shared by all workers)
+USE_CACHE = True
+
+# Merged output
+OUTPUT_DIR = "output_sharded"
+COMPRESS_OUTPUT = False  # True writes .jsonl.gz instead of .jsonl
+
+# Tries per shard before giving up on it. Threads that could not be downloaded
+# are queued again as a new shard, also up to this many times.
+MAX_ATTEMPTS = 3
+
+# Seconds between progress lines while the workers run
+PROGRESS_INTERVAL = 5
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+def process_shard(queue, task_id, task, results_tmp, matcher, post_filter, cache):
+    """Fetch, clean and match one shard's threads, writing matches to results_tmp"""
+    board = task['board']
+    stats = PostStats()
+    threads = 0
+    posts = 0
+    failed = []
+    with JsonlSink(results_tmp) as sink:
+        for thread_no in task['threads']:
+            thread_data, _ = get_thread(board, thread_no, cache=cache)
+            if not thread_data or 'posts' not in thread_data:
+                failed.append(thread_no)
+                continue
+            for record in thread_records(board, thread_no, thread_data, keep=post_filter):
+                matched = matcher.match(record['text'])
+                if matched:
+                    post_data = match_record(record, matched)
+                    sink.write(post_data)
+                    stats.add_record(post_data)
+            threads += 1
+            posts += len(thread_data['posts'])
+            queue.heartbeat(task_id)
+        matches = sink.count
+    return {"threads": threads, "posts": posts, "matches": matches, "failed": failed, "stats": stats.to_state()}
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def failed_result(task, error):
+    """Result of a shard given up on: all its threads failed"""
+    return {"threads": 0, "posts": 0, "matches": 0, "failed": task['threads'],
+            "stats": PostStats().to_state(), "error": str(error)}
+
+def run_worker(queue_dir, index, rate_share):
+    """Worker process: take shards from the queue until every shard is done"""
+    # A forked worker gets its own connections and its share of the request rate
+    reset_session()
+    share_rate(rate_share)
+    queue = WorkQueue(queue_dir)
+    job = queue.job()
+    if job is None:
+        print(f"No job in {queue_dir}, nothing to do")
+        return
+    # The job's settings, not this machine's: every worker must match the same way
+    matcher = KeywordMatcher(job['keywords'], whole_word=job['whole_word'])
+    post_filter = PostFilter(job['filters'])
+    cache = ResponseCache() if job['use_cache'] else None
+    name = worker_name(index)
+
+    try:
+        while True:
+            claimed = queue.claim(name)
+            if claimed is None:
+                # Nothing pending: take over shards of workers that died or stopped responding
+                requeued = queue.requeue_dead() + queue.requeue_stale()
+                if requeued:
+                    print(f"Worker {name}: requeued {requeued} shards of workers that stopped")
+                    continue
+                if not queue.counts()['claimed']:
+                    break
+                # Other workers still hold shards, which may fail or add retry shards
+                time.sleep(IDLE_POLL)
+                continue
+            task_id, task = claimed
+            attempt = task.get("attempt", 1)
+            results_tmp = queue.results_tmp_path(task_id, name)
+            try:
+                result = process_shard(queue, task_id, task, results_tmp, matcher, post_filter, cache)
+            except Exception as e:
+                remove_file(results_tmp)
+                if attempt < MAX_ATTEMPTS:
+                    print(f"Worker {name}: error in shard {task_id} (attempt {attempt}), queued again: {e}")
+                    queue.release(task_id, {**task, "attempt": attempt + 1})
+                else:
+                    print(f"Worker {name}: giving up on shard {task_id} after {attempt} attempts: {e}")
+                    queue.complete(task_id, task, failed_result(task, e))
+                continue
+            if result['failed'] and attempt < MAX_ATTEMPTS:
+                # A new shard right after this one, so the merged output keeps its order
+                queue.add(f"{task_id}-{attempt + 1}", {"board": task['board'], "threads": result['failed'],
+                                                       "attempt": attempt + 1})
+                result['retried'] = True
+            queue.complete(task_id, task, result, results_tmp)
+    finally:
+        if cache:
+            cache.save()
+
+# ============================================================================
+# COORDINATOR
+# ============================================================================
+
+def list_threads():
+    """Thread numbers to crawl, newest first"""
+    if SOURCE == "archive":
+        archive_index = ArchiveIndex(BOARD)
+        if not archive_index.refresh():
+            print("Archive index unavailable (archive.json could not be downloaded)")
+            print("Note: Some boards (like /b/) don't have archives.")
+            return []
+        thread_nos = archive_index.threads[::-1]
+    else:
+        catalog = get_catalog(BOARD) or []
+        thread_nos = [thread['no'] for page in catalog for thread in page.get('threads', [])]
+    return thread_nos[:MAX_THREADS] if MAX_THREADS else thread_nos
+
+def job_filters():
+    """FILTERS as stored in the job, with dates as Unix times (the job is JSON)"""
+    return {name: value.timestamp() if isinstance(value, datetime) else value for name, value in FILTERS.items()}
+
+def fill_queue(queue):
+    """Split the thread listing into shards and start a job in the queue"""
+    thread_nos = list_threads()
+    shards = [thread_nos[i:i + SHARD_SIZE] for i in range(0, len(thread_nos), SHARD_SIZE)]
+    job = {"board": BOARD, "source": SOURCE, "keywords": KEYWORDS, "whole_word": WHOLE_WORD,
+           "filters": job_filters(), "use_cache": USE_CACHE, "created": datetime.now().strftime("%Y%m%d_%H%M%S")}
+    queue.fill(job, [{"board": BOARD, "threads": shard} for shard in shards])
+    print(f"Queued {len(thread_nos)} threads of /{BOARD}/ in {len(shards)} shards of up to {SHARD_SIZE}")
+
+def run_workers(queue):
+    """Run WORKERS worker processes on the queue, printing progress until they finish"""
+    rate_share = 1 / (TOTAL_WORKERS or WORKERS)
+    context = multiprocessing.get_context()
+    processes = [context.Process(target=run_worker, args=(QUEUE_DIR, i, rate_share)) for i in range(WORKERS)]
+    for process in processes:
+        process.start()
+    print(f"Started {WORKERS} workers")
+
+    while any(process.is_alive() for process in processes):
+        for process in processes:
+            process.join(timeout=PROGRESS_INTERVAL / len(processes))
+        counts = queue.counts()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Shards: {counts['done']} done, "
+              f"{counts['claimed']} in progress, {counts['pending']} pending")
+
+def merge_results(queue, started):
+    """Concatenate the finished shards' matches (in shard order) and merge their statistics"""
+    job = queue.job()
+    counts = queue.counts()
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    extension = ".jsonl.gz" if COMPRESS_OUTPUT else ".jsonl"
+    sink = JsonlSink(os.path.join(OUTPUT_DIR, f"{job['board']}_sharded_{job['created']}{extension}"),
+                     compress=COMPRESS_OUTPUT)
+    stats = PostStats()
+    threads = 0
+    posts = 0
+    failed = []
+    errors = []
+
+    with sink:
+        for task_id, task in queue.done_tasks():
+            result = task['result']
+            if os.path.exists(queue.results_path(task_id)):
+                for record in read_jsonl(queue.results_path(task_id)):
+                    sink.write(record)
+            stats.merge(PostStats.from_state(result['stats']))
+            threads += result['threads']
+            posts += result['posts']
+            # Threads passed on to a retry shard are counted there
+            if not result.get('retried'):
+                failed += result['failed']
+            if 'error' in result:
+                errors.append(f"{task_id}: {result['error']}")
+    stats_path = report_path(sink.path, '_stats.json')
+    stats.save(stats_path)
+    summary = stats.summary()
+    elapsed = time.time() - started
+
+    print(f"\n{'='*80}")
+    print(f"SHARDED CRAWL RESULTS - /{job['board']}/ ({job['source']})")
+    print(f"Shards merged: {counts['done']}")
+    if counts['pending'] or counts['claimed']:
+        print(f"Shards not finished yet: {counts['pending'] + counts['claimed']} "
+              f"(run again with ROLE = \"merge\" once every worker is done)")
+    print(f"Threads processed: {threads}")
+    if errors:
+        print(f"Shards given up after {MAX_ATTEMPTS} attempts: {len(errors)}")
+        for error in errors:
+            print(f"  {error}")
+    if failed:
+        print(f"Threads that could not be processed: {len(failed)}")
+        print(f"  {', '.join(str(thread_no) for thread_no in sorted(failed))}")
+    print(f"Total posts checked: {posts}")
+    print(f"Posts with keywords: {sink.count}")
+    print(f"Unique threads with matches: {summary['distinct_threads']}")
+    print(f"Distinct posters (approx.): {summary['distinct_posters']}")
+    if ROLE == "all":
+        print(f"Run time: {elapsed:.1f}s, {posts / elapsed if elapsed else 0:.0f} posts/s")
+    print(f"\n✓ Saved {sink.count} posts to {sink.path}")
+    print(f"✓ Saved statistics to {stats_path}")
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    print("4chan Sharded Crawl")
+    print("="*80)
+    started = time.time()
+    queue = WorkQueue(QUEUE_DIR)
+    job = queue.job()
+
+    if ROLE == "all":
+        if job is None:
+            fill_queue(queue)
+        else:
+            counts = queue.counts()
+            print(f"Continuing the job in {QUEUE_DIR} (created {job['created']}): {counts['done']} shards done, "
+                  f"{counts['claimed'] + counts['pending']} left")
+            if job['keywords'] != KEYWORDS or job['filters'] != job_filters():
+                print("Note: the job keeps the keywords and filters it was created with. "
+                      "Delete the queue folder to start a new job.")
+    elif job is None:
+        raise SystemExit(f"No job in {QUEUE_DIR}: start one with ROLE = \"all\" first")
+
+    if ROLE in ("all", "worker"):
+        # Shards held by workers of an earlier, interrupted run on this machine
+        requeued = queue.requeue_dead()
+        if requeued:
+            print(f"Requeued {requeued} shards of workers that are no longer running")
+        run_workers(queue)
+    if ROLE in ("all", "merge"):
+        merge_results(queue, started)
+
+    print("\n✓ Script completed!")
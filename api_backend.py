@@ -0,0 +1,148 @@
+from datetime import datetime, timezone
+
+from fourchan_fetch import fetch_json, fetch_body, decode_body, catalog_url, thread_url
+from html_cleaner import clean_html, page_text
+from response_cache import is_immutable_thread
+
+# ============================================================================
+# OFFICIAL API BACKEND
+# ============================================================================
+# Catalog, thread and archive access over the official read-only JSON API, on
+# the shared session: paced by the request scheduler, decoded by api_decode,
+# cached by ResponseCache and safe to call from worker threads. Archived
+# threads are served by the same thread endpoint as live ones.
+#
+# post_record() turns an API post into the fields the archived script exports,
+# pychan_record() does the same for a pychan Post, so both backends produce
+# identical output records.
+
+# Where 4chan serves uploaded files
+MEDIA_BASE = "https://i.4cdn.org"
+
+def get_catalog(board):
+    """A board's catalog (list of pages), or None on failure"""
+    return fetch_json(catalog_url(board), schema="catalog")
+
+def get_thread(board, thread_no, cache=None, priority=None):
+    """A thread's JSON, from the cache when possible: (thread_data or None, downloaded)
+
+    The cache keeps the response body as downloaded and it is decoded on every read,
+    so fields added to api_decode.py later are there for cached threads too.
+    """
+    if cache:
+        raw = cache.get(board, thread_no)
+        if raw is not None:
+            try:
+                return decode_body(raw, schema="thread"), False
+            except ValueError as e:
+                print(f"Ignoring unreadable cached thread /{board}/{thread_no}: {e}")
+    url = thread_url(board, thread_no)
+    raw = fetch_body(url, priority=priority)
+    if raw is None:
+        return None, True
+    try:
+        thread_data = decode_body(raw, schema="thread")
+    except ValueError as e:
+        print(f"Error fetching {url}: {e}")
+        return None, True
+    if cache and thread_data:
+        cache.put(board, thread_no, raw, immutable=is_immutable_thread(thread_data))
+    return thread_data, True
+
+# ============================================================================
+# OUTPUT RECORDS
+# ============================================================================
+
+def file_url(board, post):
+    """URL of a post's uploaded file, or None"""
+    if 'tim' not in post:
+        return None
+    return f"{MEDIA_BASE}/{board}/{post['tim']}{post.get('ext', '')}"
+
+def post_record(board, thread_no, post, thread_title=None, thread_is_archived=False):
+    """Archived-script fields of one API post (missing values are None)
+
+    file_md5 is the base64 md5 4chan publishes for every file.
+    """
+    has_file = 'tim' in post
+    return {
+        'thread_title': thread_title,
+        'thread_board': board,
+        'thread_number': thread_no,
+        'thread_is_archived': thread_is_archived,
+        'post_number': post.get('no'),
+        'timestamp': str(datetime.fromtimestamp(post.get('time', 0), timezone.utc)),
+        'poster_name': post.get('name', 'Anonymous'),
+        'poster_id': post.get('id'),
+        'poster_flag': post.get('country_name') or post.get('flag_name'),
+        'text': page_text(post.get('com', '')),
+        'is_original_post': post.get('resto', 0) == 0,
+        'has_file': has_file,
+        'file_url': file_url(board, post) if has_file else None,
+        'file_name': f"{post.get('filename', '')}{post.get('ext', '')}" if has_file else None,
+        'file_md5': post.get('md5') if has_file else None,
+        'file_size': post.get('fsize') if has_file else None,
+    }
+
+def thread_records(board, thread_no, thread_data, keep=None):
+    """Records for the posts of a thread JSON document
+
+    keep (e.g. a post_filter.PostFilter) is checked on each raw API post first, so
+    posts it rejects are never cleaned.
+    """
+    posts = thread_data.get('posts') or []
+    if not posts:
+        return []
+    op = posts[0]
+    title = clean_html(op.get('sub', '')) or None
+    archived = bool(op.get('archived'))
+    if keep is not None:
+        posts = [post for post in posts if keep(post)]
+    return [post_record(board, thread_no, post, title, archived) for post in posts]
+
+def match_record(record, matched_keywords):
+    """The archived script's output line for a matching record (URLs added, placeholders for missing values)"""
+    thread_url = f"https://boards.4chan.org/{record['thread_board']}/thread/{record['thread_number']}"
+    return {
+        'thread_title': record['thread_title'] if record['thread_title'] else "No Title",
+        'thread_board': record['thread_board'],
+        'thread_number': record['thread_number'],
+        'thread_url': thread_url,
+        'thread_is_archived': record['thread_is_archived'],
+        'post_number': record['post_number'],
+        'post_url': f"{thread_url}#p{record['post_number']}",
+        'timestamp': record['timestamp'],
+        'poster_name': record['poster_name'],
+        'poster_id': record['poster_id'] if record['poster_id'] else "No ID",
+        'poster_flag': record['poster_flag'] if record['poster_flag'] else "No Flag",
+        'text': record['text'],
+        'matched_keywords': matched_keywords,
+        'is_original_post': record['is_original_post'],
+        'has_file': record['has_file'],
+        'file_url': record['file_url'],
+        'file_name': record['file_name'],
+        'file_md5': record['file_md5'],
+        'file_size': record['file_size'],
+    }
+
+def pychan_record(post):
+    """Record for a pychan Post, same fields as post_record"""
+    return {
+        'thread_title': post.thread.title,
+        'thread_board': post.thread.board,
+        'thread_number': post.thread.number,
+        'thread_is_archived': post.thread.is_archived,
+        'post_number': post.number,
+        'timestamp': str(post.timestamp),
+        'poster_name': post.poster.name,
+        'poster_id': post.poster.id,
+        'poster_flag': post.poster.flag,
+        'text': post.text,
+        'is_original_post': post.is_original_post,
+        'has_file': post.file is not None,
+        'file_url': post.file.url if post.file else None,
+        'file_name': post.file.name if post.file else None,
+        # Not shown on the page: files are then deduplicated after download
+        'file_md5': None,
+        'file_size': None,
+    }
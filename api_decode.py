@@ -0,0 +1,106 @@
+import json
+from typing import List, TypedDict
+
+# msgspec decodes straight into the schema below and skips every other field;
+# orjson decodes everything but much faster than the json module. Both are
+# optional, the standard library is used when neither is installed.
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# False always uses the standard json module (for comparing results)
+FAST_DECODE = True
+
+# ============================================================================
+# SCHEMA
+# ============================================================================
+# The fields of the official API that the scrapers read. Everything else in a
+# post (image dimensions, thumbnails, capcodes, trip codes, ...) is never
+# turned into Python objects when msgspec is installed. Posts stay plain dicts,
+# so post.get('com', '') works the same whichever decoder ran.
+#
+# Add a field here before reading it from API data, or it will be missing
+# whenever msgspec is installed.
+
+class Post(TypedDict, total=False):
+    no: int
+    resto: int
+    time: int
+    name: str
+    id: str
+    sub: str
+    com: str
+    country: str
+    country_name: str
+    board_flag: str
+    flag_name: str
+    replies: int
+    images: int
+    tim: int
+    filename: str
+    ext: str
+    fsize: int
+    md5: str
+    sticky: int
+    closed: int
+    archived: int
+    last_modified: int
+
+class CatalogThread(Post, total=False):
+    last_replies: List[Post]
+
+class ThreadDocument(TypedDict):
+    posts: List[Post]
+
+class CatalogPage(TypedDict, total=False):
+    page: int
+    threads: List[CatalogThread]
+
+SCHEMAS = {
+    "thread": ThreadDocument,
+    "catalog": List[CatalogPage],
+}
+
+# ============================================================================
+# DECODING
+# ============================================================================
+
+if msgspec is not None:
+    _decoders = {name: msgspec.json.Decoder(schema) for name, schema in SCHEMAS.items()}
+    _generic_decoder = msgspec.json.Decoder()
+
+def decoder_name():
+    """Which library decode() uses"""
+    if not FAST_DECODE:
+        return "json"
+    if msgspec is not None:
+        return "msgspec"
+    return "orjson" if orjson is not None else "json"
+
+def decode(raw, schema=None):
+    """Decode a JSON response body (bytes), only the schema's fields when msgspec is available
+
+    schema is "thread", "catalog" or None for any document. Raises ValueError on invalid JSON.
+    """
+    if FAST_DECODE and msgspec is not None:
+        try:
+            if schema is None:
+                return _generic_decoder.decode(raw)
+            return _decoders[schema].decode(raw)
+        except msgspec.ValidationError:
+            # A field with an unexpected type: decode the whole document instead of failing
+            return _generic_decoder.decode(raw)
+        except msgspec.DecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+    if FAST_DECODE and orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
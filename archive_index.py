@@ -0,0 +1,112 @@
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+
+from fourchan_fetch import fetch_json, archive_url
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Where archive snapshots are stored, one file per board
+INDEX_DIR = os.path.join(".cache", "archive")
+
+# ============================================================================
+# ARCHIVE INDEX
+# ============================================================================
+# A local copy of a board's archive listing. The official archive.json is a
+# single request containing every archived thread number, so counting or
+# listing the archive no longer means walking pychan's archive page.
+#
+# Each refresh is compared with the previous snapshot to find threads that
+# were newly archived and threads that expired (were pruned from the archive).
+# Crawlers can mark threads as seen, and ask for the ones they never processed.
+
+class ArchiveIndex:
+    """Snapshot of a board's archived thread numbers, kept sorted on disk"""
+
+    def __init__(self, board, directory=INDEX_DIR):
+        self.board = board
+        self.path = os.path.join(directory, f"{board}.json")
+        self.updated = None
+        self.threads = []
+        self.new_threads = []
+        self.expired_threads = []
+        self._seen = set()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.updated = data.get("updated")
+                self.threads = data.get("threads", [])
+                self.new_threads = data.get("new", [])
+                self.expired_threads = data.get("expired", [])
+                self._seen = set(data.get("seen", []))
+            except (OSError, ValueError) as e:
+                print(f"Could not read archive index {self.path}, starting fresh: {e}")
+
+    def refresh(self):
+        """Download archive.json and diff it against the previous snapshot; False on failure"""
+        listing = fetch_json(archive_url(self.board))
+        if listing is None:
+            return False
+
+        current = sorted(set(listing))
+        previous = set(self.threads)
+        current_set = set(current)
+        self.new_threads = [no for no in current if no not in previous]
+        self.expired_threads = sorted(previous - current_set)
+        self.threads = current
+        # Expired threads can never be fetched again, no need to remember them
+        self._seen &= current_set
+        self.updated = int(time.time())
+        self.save()
+        return True
+
+    @property
+    def count(self):
+        return len(self.threads)
+
+    @property
+    def first(self):
+        """Oldest archived thread number, or None for an empty index"""
+        return self.threads[0] if self.threads else None
+
+    @property
+    def last(self):
+        """Newest archived thread number, or None for an empty index"""
+        return self.threads[-1] if self.threads else None
+
+    def between(self, low, high):
+        """Archived thread numbers with low <= number <= high"""
+        return self.threads[bisect_left(self.threads, low):bisect_right(self.threads, high)]
+
+    def contains(self, thread_no):
+        i = bisect_left(self.threads, thread_no)
+        return i < len(self.threads) and self.threads[i] == thread_no
+
+    def unseen(self, newest_first=True):
+        """Archived threads that were never marked as seen"""
+        threads = [no for no in self.threads if no not in self._seen]
+        return threads[::-1] if newest_first else threads
+
+    def is_seen(self, thread_no):
+        return thread_no in self._seen
+
+    def mark_seen(self, thread_no):
+        self._seen.add(thread_no)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "board": self.board,
+                "updated": self.updated,
+                "threads": self.threads,
+                "new": self.new_threads,
+                "expired": self.expired_threads,
+                "seen": sorted(self._seen),
+            }, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,77 @@
+import json
+import os
+import re
+import timeit
+
+from html_cleaner import clean_html
+from mock_4chan_server import to_4chan_html
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Example export used to build realistic post bodies
+SAMPLE_FILE = os.path.join("output example", "pol_filtered_20251021_000646.json")
+
+# How many times the whole sample is cleaned per measurement
+ROUNDS = 200
+
+# ============================================================================
+# PREVIOUS IMPLEMENTATION (kept here for comparison)
+# ============================================================================
+
+def legacy_clean_html(text):
+    """clean_html as it was before html_cleaner.py"""
+    if not text:
+        return ""
+    clean = re.sub(r'<[^<]+?>', '', text)
+    clean = clean.replace('&gt;', '>')
+    clean = clean.replace('&lt;', '<')
+    clean = clean.replace('&quot;', '"')
+    clean = clean.replace('&amp;', '&')
+    clean = clean.replace('&#039;', "'")
+    clean = clean.replace('<br>', '\n')
+    clean = clean.replace('<wbr>', '')
+    clean = re.sub(r'>>\d+>', '', clean)
+    clean = re.sub(r'^>+', '> ', clean, flags=re.MULTILINE)
+    return clean.strip()
+
+# ============================================================================
+# SAMPLE DATA
+# ============================================================================
+
+def load_samples():
+    """Post bodies from the example export, as HTML and as plain text"""
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        posts = json.load(f)
+    texts = [post['text'] for post in posts if post.get('text')]
+    html_bodies = [to_4chan_html(text) for text in texts]
+    plain_bodies = [text.replace('>', '').replace('&', '') for text in texts]
+    return html_bodies, plain_bodies
+
+def measure(func, bodies):
+    """Microseconds per post for func over bodies"""
+    seconds = timeit.timeit(lambda: [func(body) for body in bodies], number=ROUNDS)
+    return seconds / (ROUNDS * len(bodies)) * 1e6
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    html_bodies, plain_bodies = load_samples()
+    print(f"clean_html benchmark ({len(html_bodies)} posts x {ROUNDS} rounds)")
+    print("="*80)
+
+    for label, bodies in (("Posts with markup", html_bodies), ("Plain posts (fast path)", plain_bodies)):
+        legacy = measure(legacy_clean_html, bodies)
+        current = measure(clean_html, bodies)
+        print(f"{label}:")
+        print(f"  legacy clean_html: {legacy:8.2f} us/post")
+        print(f"  html_cleaner:      {current:8.2f} us/post  ({legacy / current:.2f}x)")
+
+    # Show one post through both cleaners so behaviour differences are visible
+    sample = next((body for body in html_bodies if 'quotelink' in body), html_bodies[0])
+    print("="*80)
+    print("Legacy output:  ", repr(legacy_clean_html(sample)[:120]))
+    print("Current output: ", repr(clean_html(sample)[:120]))
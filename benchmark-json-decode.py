@@ -0,0 +1,65 @@
+import json
+import random
+import timeit
+
+import api_decode
+from api_decode import decode, msgspec, orjson
+from mock_4chan_server import _api_post, load_sample_texts
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Replies in the benchmark thread (busy /pol/ threads reach the 300 reply bump limit)
+REPLIES = 300
+
+# How many times the thread is decoded per measurement
+ROUNDS = 200
+
+# ============================================================================
+# SAMPLE DATA
+# ============================================================================
+
+def build_thread():
+    """A thread document as the official API serves it, with post bodies from the example export"""
+    rng = random.Random(4)
+    texts = load_sample_texts()
+    posts = [_api_post(100000 + i, 0 if i == 0 else 100000, 1760000000 + i * 30,
+                       texts[rng.randrange(len(texts))], rng, "Thread title" if i == 0 else None)
+             for i in range(REPLIES + 1)]
+    for post in posts:
+        # Fields the real API sends that the scrapers never read
+        post.update({"now": "10/20/25(Mon)18:43:15", "capcode": "none", "trip": "!abc", "tn_w": 250,
+                     "tn_h": 187, "semantic_url": "thread-title", "unique_ips": 120})
+    return json.dumps({"posts": posts}).encode('utf-8')
+
+def measure(func, raw):
+    """Milliseconds per decode"""
+    return timeit.timeit(lambda: func(raw), number=ROUNDS) / ROUNDS * 1000
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    raw = build_thread()
+    print(f"Thread JSON decode benchmark ({REPLIES} replies, {len(raw) / 1024:.0f} KB, {ROUNDS} rounds)")
+    print("="*80)
+
+    # What response.json() did: decode the bytes to text, then parse the text
+    baseline = measure(lambda body: json.loads(body.decode('utf-8')), raw)
+    print(f"  response.json() equivalent: {baseline:7.3f} ms")
+
+    candidates = [("json (bytes)", lambda body: json.loads(body))]
+    if orjson is not None:
+        candidates.append(("orjson", orjson.loads))
+    if msgspec is not None:
+        candidates.append(("msgspec, all fields", msgspec.json.Decoder().decode))
+        candidates.append(("msgspec, schema fields", lambda body: decode(body, "thread")))
+    for label, func in candidates:
+        current = measure(func, raw)
+        print(f"  {label + ':':<27} {current:7.3f} ms  ({baseline / current:.2f}x)")
+
+    print("="*80)
+    print(f"Scrapers use: {api_decode.decoder_name()}"
+          + ("" if msgspec else " (pip install msgspec to decode only the fields in api_decode.py)"))
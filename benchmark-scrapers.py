@@ -0,0 +1,241 @@
+import ast
+import contextlib
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+from mock_4chan_server import MockBoard, MockServer, LIVE_THREADS, ARCHIVED_THREADS, POSTS_PER_THREAD
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Scrapers run end to end against the local stand-in server, nothing touches
+# the network. Each runs in its own process so peak memory is its own.
+PIPELINES = {
+    "official-api": ("4chan-api-official-api.py", {"MAX_WORKERS": 8}),
+    "pychan-live": ("4chan-api-pychan-api.py", {}),
+    "archived-official": ("4chan-api-pychan-archived.py", {"max_threads": ARCHIVED_THREADS, "backend": "official"}),
+    "archived-pychan": ("4chan-api-pychan-archived.py", {"max_threads": ARCHIVED_THREADS, "backend": "pychan"}),
+}
+
+# Requests per second allowed to the stand-in server (None = unpaced). The real
+# site is paced at 1 req/s, unpaced runs measure how fast the scrapers process data.
+REQUEST_RATE = None
+
+# Results are saved here, one file per run, and compared with the previous run
+RESULTS_DIR = "benchmark_results"
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ============================================================================
+# STAGE TIMERS
+# ============================================================================
+
+class StageTimer:
+    """Total time and call count of wrapped functions, summed over all threads"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, name, func):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    total, calls = self.stages.get(name, (0.0, 0))
+                    self.stages[name] = (total + elapsed, calls + 1)
+        return timed
+
+def install_timers(timer):
+    """Time the per-post stages wherever the scrapers call them"""
+    import html_cleaner
+    import keyword_matcher
+    # Scripts import clean_html by name, so the wrapper must be in place before they run
+    html_cleaner.clean_html = timer.wrap("clean_html", html_cleaner.clean_html)
+    keyword_matcher.KeywordMatcher.match = timer.wrap("check_keywords", keyword_matcher.KeywordMatcher.match)
+    try:
+        from pychan import FourChan
+    except ImportError:
+        return
+    FourChan._parse_post_from_html = timer.wrap("pychan_parse", FourChan._parse_post_from_html)
+
+# ============================================================================
+# RUNNING A SCRIPT
+# ============================================================================
+
+def run_script(path, overrides):
+    """Run a script as __main__ with some of its top-level settings replaced
+
+    The scripts keep their configuration in plain module-level assignments, so
+    the assignments named in overrides get their value from the overrides instead.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    namespace = {"__name__": "__main__", "__file__": path}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name in overrides:
+                namespace[f"_override_{name}"] = overrides[name]
+                node.value = ast.copy_location(ast.Name(id=f"_override_{name}", ctx=ast.Load()), node.value)
+    exec(compile(tree, path, 'exec'), namespace)
+
+def peak_rss_bytes():
+    """Peak resident memory of this process, or None where unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def run_pipeline(script, overrides, server_url, server_host, results):
+    """Child process: run one scraper against the stand-in server and report its numbers"""
+    sys.path.insert(0, REPO_DIR)
+    import fourchan_fetch
+    import request_scheduler
+
+    fourchan_fetch.API_BASE = server_url
+    request_scheduler.SITE_BASE = server_url
+    rate = REQUEST_RATE or 1000000.0
+    request_scheduler.HOST_LIMITS[server_host] = (rate, max(1, int(min(rate, 100))))
+
+    timer = StageTimer()
+    install_timers(timer)
+
+    # Outputs, caches and manifests go to a scratch directory, every run starts cold
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        started = time.perf_counter()
+        error = None
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                contextlib.redirect_stderr(devnull):
+            try:
+                run_script(os.path.join(REPO_DIR, script), overrides)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - started
+        os.chdir(REPO_DIR)
+
+    results.put({
+        "seconds": elapsed,
+        "peak_rss": peak_rss_bytes(),
+        "stages": timer.stages,
+        "error": error,
+    })
+
+def benchmark(name, script, overrides, server):
+    """Run one pipeline in a fresh process and combine its numbers with the server's"""
+    server.reset_counters()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_pipeline, args=(script, overrides, server.url, server.host, results))
+    process.start()
+    result = results.get()
+    process.join()
+
+    seconds = result["seconds"]
+    result.update({
+        "pipeline": name,
+        "requests": server.requests,
+        "posts": server.posts_served,
+        "posts_per_sec": server.posts_served / seconds if seconds else 0.0,
+        "requests_per_sec": server.requests / seconds if seconds else 0.0,
+    })
+    return result
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def previous_results():
+    """Results of the most recent earlier benchmark run, or None"""
+    directory = os.path.join(REPO_DIR, RESULTS_DIR)
+    if not os.path.isdir(directory):
+        return None
+    files = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+    if not files:
+        return None
+    with open(os.path.join(directory, files[-1]), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def print_result(result, previous):
+    print(f"{result['pipeline']}:")
+    if result["error"]:
+        print(f"  FAILED: {result['error']}")
+    rss = f"{result['peak_rss'] / 1024 / 1024:.1f} MB" if result["peak_rss"] else "n/a"
+    change = ""
+    if previous and previous.get("posts_per_sec"):
+        change = f"  ({(result['posts_per_sec'] / previous['posts_per_sec'] - 1) * 100:+.1f}% vs {previous['commit']})"
+    print(f"  Wall time: {result['seconds']:.2f}s")
+    print(f"  Posts:     {result['posts']} ({result['posts_per_sec']:.0f} posts/s){change}")
+    print(f"  Requests:  {result['requests']} ({result['requests_per_sec']:.1f} req/s)")
+    print(f"  Peak RSS:  {rss}")
+    # Stage times are summed over worker threads, so they can exceed the wall time
+    for stage, (total, calls) in sorted(result["stages"].items()):
+        print(f"  {stage + ':':<17}{total:.3f}s in {calls} calls ({total / calls * 1e6:.1f} us/call)")
+    print()
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    board = MockBoard()
+    server = MockServer(board).start()
+    # Time windows that cover the whole synthetic board
+    window = {"start": datetime.fromtimestamp(board.now, timezone.utc) - timedelta(days=2),
+              "end": datetime.fromtimestamp(board.now, timezone.utc) + timedelta(hours=1)}
+    time_overrides = {
+        "4chan-api-official-api.py": {"START_DATE": window["start"], "END_DATE": window["end"]},
+        "4chan-api-pychan-api.py": {"start_date": window["start"], "end_date": window["end"]},
+    }
+
+    commit = git_commit()
+    previous = previous_results()
+    print(f"Scraper benchmark at {commit or 'unknown commit'}")
+    print(f"Board: {LIVE_THREADS} live + {ARCHIVED_THREADS} archived threads, {POSTS_PER_THREAD} posts each, "
+          f"served from {server.url}")
+    print(f"Request rate: {REQUEST_RATE or 'unpaced'}")
+    print("="*80)
+
+    results = []
+    for name, (script, overrides) in PIPELINES.items():
+        overrides = {**overrides, **time_overrides.get(script, {})}
+        result = benchmark(name, script, overrides, server)
+        earlier = next((r for r in (previous or {}).get("results", []) if r["pipeline"] == name), None)
+        if earlier is not None:
+            earlier["commit"] = previous.get("commit")
+        print_result(result, earlier)
+        results.append(result)
+    server.stop()
+
+    os.makedirs(os.path.join(REPO_DIR, RESULTS_DIR), exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(REPO_DIR, RESULTS_DIR, f"{timestamp}_{commit or 'unknown'}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"commit": commit, "created": timestamp, "request_rate": REQUEST_RATE,
+                   "board": {"live_threads": LIVE_THREADS, "archived_threads": ARCHIVED_THREADS,
+                             "posts_per_thread": POSTS_PER_THREAD},
+                   "results": results}, f, indent=2)
+    print("="*80)
+    print(f"✓ Results saved to {path}")
@@ -0,0 +1,44 @@
+from fourchan_fetch import fetch_concurrently, MAX_WORKERS
+
+# ============================================================================
+# MULTI-BOARD FAN-OUT
+# ============================================================================
+# Several boards are crawled as one job: one session, one worker pool and one
+# request budget (every board is served by the same API host, so they share
+# its token bucket in request_scheduler.py).
+#
+# Fairness: each board's queue is ordered on its own (most recently bumped
+# first) and a request's position in its board's queue becomes its scheduler
+# priority. The queues are handed to the pool round-robin, so the scheduler
+# grants the 1st thread of every board, then the 2nd of every board, and so
+# on. A busy board cannot use up the budget before a quiet one gets its turn,
+# and once a quiet board runs out of work the busy ones get all the requests.
+
+def fair_order(queues):
+    """Round-robin merge of per-board work lists: [(board, item, rank), ...]"""
+    merged = []
+    longest = max((len(items) for items in queues.values()), default=0)
+    for rank in range(longest):
+        for board, items in queues.items():
+            if rank < len(items):
+                merged.append((board, items[rank], rank))
+    return merged
+
+def fetch_fair(func, queues, max_workers=MAX_WORKERS):
+    """Run func(board, item, rank) over every board's queue on one shared pool
+
+    queues maps board -> items in the order that board wants them. rank is the
+    item's position in its queue, to be passed on as the request priority.
+    Returns board -> results, in the same order as that board's queue.
+    """
+    order = fair_order(queues)
+    results = fetch_concurrently(lambda job: func(*job), order, max_workers)
+    by_board = {board: [] for board in queues}
+    # Jobs are merged rank by rank, so each board's results come back in queue order
+    for (board, _, _), result in zip(order, results):
+        by_board[board].append(result)
+    return by_board
+
+def board_label(boards):
+    """Name used in output file names for a set of boards ("pol" or "pol+int+biz")"""
+    return "+".join(boards)
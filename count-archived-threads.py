@@ -1,22 +1,23 @@
-from pychan import FourChan, LogLevel, PychanLogger
-
-# Initialize pychan
-logger = PychanLogger(LogLevel.INFO)
-fourchan = FourChan(logger=logger, raise_http_exceptions=False)
+from datetime import datetime
+from archive_index import ArchiveIndex
 
 board = "pol"
 
 print(f"Counting total archived threads on /{board}/...")
 
-try:
-    thread_count = 0
-    for thread in fourchan.get_archived_threads(board):
-        thread_count += 1
-        if thread_count % 100 == 0:  # Progress indicator
-            print(f"Counted {thread_count} threads so far...")
-    
-    print(f"\n✅ Total archived threads available on /{board}/: {thread_count}")
-    
-except Exception as e:
-    print(f"Error: {e}")
-    print("Note: Some boards (like /b/) don't have archives.")
\ No newline at end of file
+# One request for archive.json instead of walking the whole archive listing
+index = ArchiveIndex(board)
+previous_update = index.updated
+
+if index.refresh():
+    print(f"\n✅ Total archived threads available on /{board}/: {index.count}")
+    if index.count:
+        print(f"Thread numbers: {index.first} - {index.last}")
+    if previous_update:
+        print(f"Since last check ({datetime.fromtimestamp(previous_update).strftime('%Y-%m-%d %H:%M:%S')}):")
+        print(f"  Newly archived: {len(index.new_threads)}")
+        print(f"  Expired from archive: {len(index.expired_threads)}")
+    print(f"Not yet processed by the archive crawler: {len(index.unseen())}")
+else:
+    print("Error: could not download the archive listing")
+    print("Note: Some boards (like /b/) don't have archives.")
@@ -0,0 +1,83 @@
+import json
+import os
+
+# ============================================================================
+# CRAWL STATE
+# ============================================================================
+# Remembers what the previous run already saw so the next run only downloads
+# what changed. The file looks like:
+#
+# {
+#   "pol": {
+#     "catalog_last_modified": "Tue, 21 Oct 2025 00:06:46 GMT",
+#     "threads": {
+#       "519384195": {"last_modified": 1761007606, "replies": 212,
+#                     "http_last_modified": "Tue, 21 Oct 2025 00:06:46 GMT"}
+#     }
+#   }
+# }
+
+class CrawlState:
+    """Per-board record of catalog and thread modification times"""
+
+    def __init__(self, path):
+        self.path = path
+        self.boards = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.boards = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read crawl state {path}, starting fresh: {e}")
+                self.boards = {}
+
+    def _board(self, board):
+        return self.boards.setdefault(board, {"catalog_last_modified": None, "threads": {}})
+
+    def catalog_last_modified(self, board):
+        """Last-Modified header of the catalog seen by the previous run"""
+        return self._board(board).get("catalog_last_modified")
+
+    def set_catalog_last_modified(self, board, value):
+        self._board(board)["catalog_last_modified"] = value
+
+    def thread_last_modified(self, board, thread_no):
+        """Last-Modified header of the thread JSON seen by the previous run"""
+        entry = self._board(board)["threads"].get(str(thread_no))
+        return entry.get("http_last_modified") if entry else None
+
+    def is_changed(self, board, catalog_thread):
+        """True if a catalog entry differs from what was recorded for that thread"""
+        entry = self._board(board)["threads"].get(str(catalog_thread.get('no')))
+        if entry is None:
+            return True
+        return (entry.get("last_modified") != catalog_thread.get('last_modified')
+                or entry.get("replies") != catalog_thread.get('replies', 0))
+
+    def record_thread(self, board, catalog_thread, http_last_modified=None):
+        """Store the catalog's view of a thread after it has been processed"""
+        threads = self._board(board)["threads"]
+        key = str(catalog_thread.get('no'))
+        previous = threads.get(key, {})
+        threads[key] = {
+            "last_modified": catalog_thread.get('last_modified'),
+            "replies": catalog_thread.get('replies', 0),
+            "http_last_modified": http_last_modified or previous.get("http_last_modified"),
+        }
+
+    def forget_missing(self, board, live_thread_nos):
+        """Drop threads that are no longer in the catalog (pruned or archived)"""
+        live = {str(no) for no in live_thread_nos}
+        threads = self._board(board)["threads"]
+        for key in [key for key in threads if key not in live]:
+            del threads[key]
+
+    def save(self):
+        """Write the state atomically so a crash never leaves a half-written file"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.boards, f)
+        os.replace(tmp_path, self.path)
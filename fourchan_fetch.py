@@ -0,0 +1,149 @@
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from request_scheduler import get_scheduler
+from run_metrics import get_metrics
+from api_decode import decode
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Base URL of the official read-only JSON API
+API_BASE = "https://a.4cdn.org"
+
+# Number of threads fetched at the same time (keep this modest, 4chan is shared)
+MAX_WORKERS = 8
+
+# Seconds to wait for a response before giving up on a request
+REQUEST_TIMEOUT = 15
+
+# ============================================================================
+# SESSION
+# ============================================================================
+
+_session = None
+_pool_size = 0
+
+# Returned by fetch_json_if_modified when the server answered 304 Not Modified
+NOT_MODIFIED = object()
+
+def create_session(pool_size=MAX_WORKERS):
+    """Create a keep-alive session whose connection pool fits pool_size workers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": "4chan-api-scraper"})
+    return session
+
+def get_session(pool_size=MAX_WORKERS):
+    """Return the shared session, creating it on first use
+
+    Its pool is enlarged when more than the current pool_size workers need it. A new
+    adapter drops the pooled keep-alive connections, so the pool only ever grows.
+    """
+    global _session, _pool_size
+    if _session is None:
+        _pool_size = max(pool_size, MAX_WORKERS)
+        _session = create_session(_pool_size)
+    elif pool_size > _pool_size:
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+        _pool_size = pool_size
+    return _session
+
+def reset_session():
+    """Drop the shared session, e.g. in a forked worker that must not reuse its parent's connections"""
+    global _session, _pool_size
+    _session = None
+    _pool_size = 0
+
+# ============================================================================
+# FETCHING
+# ============================================================================
+
+def http_get(url, priority=None, headers=None, session=None):
+    """GET over the shared session, paced and retried by the request scheduler"""
+    return get_scheduler().get(session or get_session(), url, priority=priority,
+                               headers=headers, timeout=REQUEST_TIMEOUT)
+
+def decode_body(raw, schema=None):
+    """Parse a JSON body (bytes), timed as the "decode" stage
+
+    schema "thread" or "catalog" keeps only the fields listed in api_decode.py
+    when msgspec is installed.
+    """
+    with get_metrics().timer("decode"):
+        return decode(raw, schema)
+
+def decode_json(response, schema=None):
+    """Parse a response body as JSON (the raw bytes, no text copy)"""
+    return decode_body(response.content, schema)
+
+def fetch_body(url, session=None, priority=None):
+    """GET a document's raw bytes over the shared session, returning None on failure"""
+    try:
+        response = http_get(url, priority=priority, session=session)
+        response.raise_for_status()
+        return response.content
+    except requests.RequestException as e:
+        print(f"Error fetching {url}: {e}")
+        return None
+
+def fetch_json(url, session=None, priority=None, schema=None):
+    """GET a JSON document over the shared session, returning None on failure"""
+    raw = fetch_body(url, session=session, priority=priority)
+    if raw is None:
+        return None
+    try:
+        return decode_body(raw, schema)
+    except ValueError as e:
+        print(f"Error fetching {url}: {e}")
+        return None
+
+def fetch_json_if_modified(url, last_modified=None, session=None, priority=None, schema=None):
+    """Conditional GET: returns (data, Last-Modified header), data is NOT_MODIFIED on 304 and None on failure"""
+    headers = {"If-Modified-Since": last_modified} if last_modified else {}
+    try:
+        response = http_get(url, priority=priority, headers=headers, session=session)
+        if response.status_code == 304:
+            return NOT_MODIFIED, last_modified
+        response.raise_for_status()
+        return decode_json(response, schema), response.headers.get("Last-Modified")
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error fetching {url}: {e}")
+        return None, last_modified
+
+def catalog_url(board):
+    """URL of a board's catalog.json"""
+    return f"{API_BASE}/{board}/catalog.json"
+
+def thread_url(board, thread_no):
+    """URL of a thread's JSON document"""
+    return f"{API_BASE}/{board}/thread/{thread_no}.json"
+
+def archive_url(board):
+    """URL of a board's archive.json (every archived thread number)"""
+    return f"{API_BASE}/{board}/archive.json"
+
+def fetch_concurrently(func, items, max_workers=MAX_WORKERS):
+    """Run func over items on a bounded worker pool, returning results in input order"""
+    items = list(items)
+    if not items:
+        return []
+    if max_workers <= 1:
+        return [func(item) for item in items]
+
+    # Enough pooled connections for every worker (remounted only when the pool must grow)
+    get_session(max_workers)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        # executor.map keeps the order of items, so results line up with the catalog
+        return list(executor.map(func, items))
+
+def thread_priority(catalog_thread):
+    """Scheduling priority for a catalog entry: most recently bumped first, then most replies"""
+    last_modified = catalog_thread.get('last_modified', catalog_thread.get('time', 0))
+    return -(last_modified + min(catalog_thread.get('replies', 0), 999999) / 1e6)
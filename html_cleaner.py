@@ -0,0 +1,79 @@
+import re
+from html import unescape
+
+# ============================================================================
+# HTML CLEANER
+# ============================================================================
+# Turns the HTML of a 4chan post ("com" / "sub" fields) into plain text:
+#   <br>                     -> line break
+#   <wbr>                    -> removed (4chan inserts it inside long words/URLs)
+#   <a class="quotelink">    -> removed with its text (>>123456789)
+#   <span class="deadlink">  -> removed with its text (quote of a deleted post)
+#   any other tag            -> removed, its text is kept
+#   &gt; &amp; &#039; ...    -> decoded (all HTML entities, not only the common ones)
+#
+# WHAT IS GREENTEXT?
+# Greentext is a distinctive 4chan posting style where lines starting with ">" appear in green color
+# Used for storytelling, quoting, implications, or emphasis. Common formats:
+# > be me                    (storytelling format)
+# > 22 years old
+# > decide to learn coding
+# > implying democracy works (sarcastic implications)
+# > Trump wins election      (listing points/events)
+# Multiple arrows at the start of a line (>>>, >>>>) are normalized to a single "> "
+
+# Quote links and dead links are dropped together with their ">>123" text
+_QUOTE_LINK = re.compile(r'<a [^>]*class="quotelink"[^>]*>.*?</a>|<span class="deadlink">.*?</span>')
+_BR = re.compile(r'<br\s*/?>', re.IGNORECASE)
+_TAG = re.compile(r'<[^>]*>')
+
+# Greentext arrows at line starts, while the text is still entity-encoded
+_ENCODED_GREENTEXT = re.compile(r'^(?:&gt;)+', re.MULTILINE)
+_GREENTEXT = re.compile(r'^>+', re.MULTILINE)
+
+def _decode_entities(text):
+    """Decode HTML entities, with a fast path for the handful 4chan emits"""
+    if '&' not in text:
+        return text
+    fast = text.replace('&gt;', '>').replace('&lt;', '<').replace('&quot;', '"').replace('&#039;', "'")
+    if fast.count('&') == fast.count('&amp;'):
+        return fast.replace('&amp;', '&')
+    # Rare entities (&#x27;, &eacute;, ...) - let the standard library handle all of them
+    return unescape(text)
+
+def clean_html(text):
+    """Remove HTML tags and decode entities from 4chan post text"""
+    if not text:
+        return ""
+
+    # Fast path: plain bodies (no tags, no entities) only need greentext and strip
+    if '<' not in text and '&' not in text:
+        if '>' in text:
+            text = _GREENTEXT.sub('> ', text)
+        return text.strip()
+
+    # One regex pass over the text per kind of markup, each skipped when a cheap
+    # substring check shows it cannot match; entities are decoded last so a
+    # decoded "<" or ">" can never be mistaken for markup or greentext
+    if 'link"' in text:
+        text = _QUOTE_LINK.sub('', text)
+    if '<br' in text:
+        text = _BR.sub('\n', text)
+    if '<' in text:
+        text = _TAG.sub('', text)
+    if '&gt;' in text:
+        text = _ENCODED_GREENTEXT.sub('> ', text)
+    return _decode_entities(text).strip()
+
+def page_text(text):
+    """Post HTML as the text shown on the page, the form pychan exports
+
+    Unlike clean_html, quote links (>>123) and greentext arrows are kept as written.
+    """
+    if not text:
+        return ""
+    if '<br' in text:
+        text = _BR.sub('\n', text)
+    if '<' in text:
+        text = _TAG.sub('', text)
+    return _decode_entities(text)
@@ -0,0 +1,211 @@
+import re
+from collections import deque
+
+# pyahocorasick is a C implementation of the same automaton, used when installed
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Without pyahocorasick, match() tests keyword lists up to this size with one
+# substring search (or small regex) per keyword, which runs in C and beats the
+# pure Python automaton until the list gets long
+SUBSTRING_LIMIT = 100
+
+# ============================================================================
+# KEYWORD MATCHER
+# ============================================================================
+# Builds one Aho-Corasick automaton for the whole keyword list, so every post
+# is scanned once no matter how many keywords there are.
+#
+# Usage:
+#   matcher = KeywordMatcher(["trump", "vote", "border wall"], whole_word=True)
+#   matcher.match("Devoted to the BORDER  wall")   -> ["border wall"]
+#   matcher.find_all("vote trump")                 -> [("vote", 0, 4), ("trump", 5, 10)]
+#
+# Options:
+#   whole_word - only match keywords that are not part of a longer word
+#                ("vote" no longer matches "devoted", but also not "votes")
+#   Keywords containing spaces are phrases: any run of whitespace in the post
+#   (spaces, line breaks, tabs) matches the space in the keyword.
+
+_WHITESPACE = re.compile(r'\s+')
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+def _normalize_keyword(keyword):
+    return _WHITESPACE.sub(' ', keyword.strip().lower())
+
+class KeywordMatcher:
+    """Case-insensitive multi-keyword matcher compiled once for a keyword list"""
+
+    def __init__(self, keywords, whole_word=False):
+        self.keywords = []
+        self.whole_word = whole_word
+        self._index = {}
+        for keyword in keywords:
+            normalized = _normalize_keyword(keyword)
+            # Keywords that only differ in case are reported once, as first written
+            if normalized and normalized not in self._index:
+                self._index[normalized] = len(self.keywords)
+                self.keywords.append(keyword)
+        self._patterns = list(self._index)
+        self._has_phrases = any(' ' in pattern for pattern in self._patterns)
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pattern, position in self._index.items():
+                self._automaton.add_word(pattern, (position, len(pattern)))
+            if self._patterns:
+                self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._build()
+        self._checks = None
+        if self._automaton is None and len(self._patterns) <= SUBSTRING_LIMIT:
+            self._checks = [self._check(pattern) for pattern in self._patterns]
+
+    def _check(self, pattern):
+        """Test for one keyword in prepared text (the SUBSTRING_LIMIT fast path of match())"""
+        if not self.whole_word:
+            return lambda text: pattern in text
+        # Same rule as finditer: only word characters at the keyword's edges need a boundary
+        regex = re.escape(pattern)
+        if _is_word_char(pattern[0]):
+            regex = r'(?<!\w)' + regex
+        if _is_word_char(pattern[-1]):
+            regex += r'(?!\w)'
+        search = re.compile(regex).search
+        # The plain substring test rules out most posts before the slower regex runs
+        return lambda text: pattern in text and search(text) is not None
+
+    def _build(self):
+        """Build the goto/fail/output tables of the pure Python automaton"""
+        goto = [{}]
+        output = [[]]
+        for pattern, position in self._index.items():
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    output.append([])
+                state = next_state
+            output[state].append((position, len(pattern)))
+
+        # Breadth-first pass to compute failure links and merge outputs
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                output[next_state] = output[next_state] + output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+        self._alphabet = set(''.join(self._patterns))
+
+    def _prepare(self, text):
+        """Lowercase text and collapse whitespace for phrases, keeping a map back to original offsets"""
+        lowered = text.lower()
+        if not self._has_phrases:
+            return lowered, None
+
+        chars = []
+        offsets = []
+        previous_space = False
+        for i, char in enumerate(lowered):
+            if char.isspace():
+                if previous_space:
+                    continue
+                char = ' '
+                previous_space = True
+            else:
+                previous_space = False
+            chars.append(char)
+            offsets.append(i)
+        offsets.append(len(lowered))
+        return ''.join(chars), offsets
+
+    def _scan(self, text):
+        """Yield (keyword position, start, end) for every occurrence in prepared text"""
+        if self._automaton is not None:
+            if self._patterns:
+                for end, (position, length) in self._automaton.iter(text):
+                    yield position, end + 1 - length, end + 1
+            return
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        alphabet = self._alphabet
+        state = 0
+        for i, char in enumerate(text):
+            if char not in alphabet:
+                state = 0
+                continue
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for position, length in output[state]:
+                yield position, i + 1 - length, i + 1
+
+    def finditer(self, text):
+        """Yield (keyword, start, end) for every occurrence of every keyword in text"""
+        if not text:
+            return
+        prepared, offsets = self._prepare(text)
+        for position, start, end in self._scan(prepared):
+            if self.whole_word:
+                pattern = self._patterns[position]
+                if start > 0 and _is_word_char(pattern[0]) and _is_word_char(prepared[start - 1]):
+                    continue
+                if end < len(prepared) and _is_word_char(pattern[-1]) and _is_word_char(prepared[end]):
+                    continue
+            if offsets is not None:
+                start, end = offsets[start], offsets[end - 1] + 1
+            yield self.keywords[position], start, end
+
+    def find_all(self, text):
+        """List of (keyword, start, end) matches ordered by where they end in the text"""
+        return list(self.finditer(text))
+
+    def match(self, text):
+        """Keywords found in text, in keyword-list order (same result shape as check_keywords)"""
+        if self._checks is not None:
+            if not text:
+                return []
+            prepared = text.lower()
+            if self._has_phrases:
+                prepared = _WHITESPACE.sub(' ', prepared)
+            return [keyword for keyword, check in zip(self.keywords, self._checks) if check(prepared)]
+        found = set()
+        for keyword, _, _ in self.finditer(text):
+            found.add(keyword)
+            if len(found) == len(self.keywords):
+                break
+        return [keyword for keyword in self.keywords if keyword in found]
+
+# Compiled matchers are cached per keyword list so callers can stay stateless
+_matchers = {}
+
+def get_matcher(keywords, whole_word=False):
+    """Return a cached KeywordMatcher for this keyword list"""
+    key = (tuple(keywords), whole_word)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = _matchers[key] = KeywordMatcher(keywords, whole_word=whole_word)
+    return matcher
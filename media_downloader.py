@@ -0,0 +1,173 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fourchan_fetch import http_get
+from run_metrics import get_metrics
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Where downloaded files are stored
+MEDIA_DIR = "media"
+
+# Files downloaded at the same time. Requests to the file host (i.4cdn.org) are
+# paced by the request scheduler like everything else (DEFAULT_LIMIT unless
+# listed in HOST_LIMITS).
+MEDIA_WORKERS = 4
+
+# ============================================================================
+# CONTENT-ADDRESSED MEDIA STORE
+# ============================================================================
+# Every file is stored once, under its md5:
+#
+#   media/3f/3f8a...c1.jpg        full file
+#   media/3f/3f8a...c1s.jpg       its thumbnail
+#   media/index.jsonl             {"board", "post", "url", "path"} per matched post
+#   media/partial/                downloads in progress
+#
+# The official API publishes each file's md5 (base64) in the post JSON, so a
+# reposted image is recognised before anything is downloaded: if its file is
+# already in the store, or being downloaded for another post, only an index line
+# is written. Without a published md5 (pychan posts) the file is downloaded and
+# stored under the md5 of its content, so the disk still holds one copy.
+#
+# Interrupted downloads are continued with an HTTP Range request on the next
+# run, finished files are never downloaded again, and full files are checked
+# against the published md5 before they are stored.
+
+def md5_hex(md5_base64):
+    """4chan's base64 md5 as a hex string"""
+    return base64.b64decode(md5_base64).hex()
+
+def thumbnail_url(file_url):
+    """URL of a file's thumbnail (always a .jpg named <tim>s.jpg)"""
+    return os.path.splitext(file_url)[0] + "s.jpg"
+
+class MediaDownloader:
+    """Bounded concurrent downloader for matched posts' files, deduplicated by md5"""
+
+    def __init__(self, directory=MEDIA_DIR, workers=MEDIA_WORKERS, byte_budget=None, thumbnails=False):
+        self.directory = directory
+        self.byte_budget = byte_budget
+        self.thumbnails = thumbnails
+        self.reserved_bytes = 0
+        self.downloaded_bytes = 0
+        self.counts = {"downloaded": 0, "deduplicated": 0, "over_budget": 0, "failed": 0}
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        # Backpressure: at most two queued downloads per worker
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+        os.makedirs(os.path.join(directory, "partial"), exist_ok=True)
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self._indexed = set()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._indexed.add((entry["board"], entry["post"]))
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def add(self, board, post_no, file_url, md5=None, size=None):
+        """Queue a post's file (blocks while the queue is full)"""
+        if (board, post_no) in self._indexed:
+            return
+        if self.thumbnails:
+            # The published md5 and size are those of the full file
+            url, suffix, size = thumbnail_url(file_url), "s.jpg", None
+        else:
+            url, suffix = file_url, os.path.splitext(file_url)[1]
+        key = md5_hex(md5) + suffix if md5 else None
+
+        with self._lock:
+            if key and (key in self._in_flight or os.path.exists(self._path(key))):
+                self.counts["deduplicated"] += 1
+                self._record(board, post_no, url, self._path(key))
+                return
+            if self.byte_budget is not None and self.reserved_bytes + (size or 0) > self.byte_budget:
+                self.counts["over_budget"] += 1
+                return
+            self.reserved_bytes += size or 0
+            if key:
+                self._in_flight.add(key)
+
+        self._slots.acquire()
+        self._executor.submit(self._download, board, post_no, url, key, md5, size, suffix)
+
+    def _download(self, board, post_no, url, key, md5, size, suffix):
+        try:
+            path = self._fetch(url, key, None if self.thumbnails else md5, size, suffix)
+            with self._lock:
+                self._record(board, post_no, url, path)
+        except Exception as e:
+            print(f"Error downloading {url}: {e}")
+            with self._lock:
+                self.counts["failed"] += 1
+                self.reserved_bytes -= size or 0
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+            self._slots.release()
+
+    def _fetch(self, url, key, md5, size, suffix):
+        """Download url into the store (continuing a partial download), returning its path"""
+        part = os.path.join(self.directory, "partial",
+                            (key or hashlib.md5(url.encode('utf-8')).hexdigest()) + ".part")
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        response = http_get(url, headers={"Range": f"bytes={offset}-"} if offset else None)
+        if response.status_code == 416:
+            # The partial file is no use (changed or already too long): start over next time
+            os.remove(part)
+        response.raise_for_status()
+        with open(part, 'ab' if response.status_code == 206 else 'wb') as f:
+            f.write(response.content)
+
+        with open(part, 'rb') as f:
+            digest = hashlib.md5(f.read()).digest()
+        if md5 and digest != base64.b64decode(md5):
+            os.remove(part)
+            raise ValueError("md5 does not match the one 4chan published")
+
+        path = self._path(key or digest.hex() + suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            self.downloaded_bytes += len(response.content)
+            # Nothing was reserved without a published size (e.g. thumbnails): charge what arrived
+            if size is None:
+                self.reserved_bytes += len(response.content)
+            if os.path.exists(path):
+                # Same content as a file stored earlier (only possible without a published md5)
+                os.remove(part)
+                self.counts["deduplicated"] += 1
+            else:
+                os.replace(part, path)
+                self.counts["downloaded"] += 1
+        get_metrics().count("media_files")
+        return path
+
+    def _record(self, board, post_no, url, path):
+        """Index line mapping a post to its stored file (call with the lock held)"""
+        self._indexed.add((board, post_no))
+        self._index.write(json.dumps({"board": board, "post": post_no, "url": url,
+                                      "path": os.path.relpath(path, self.directory)}) + "\n")
+
+    def close(self):
+        """Wait for queued downloads and close the index"""
+        self._executor.shutdown(wait=True)
+        self._index.close()
+
+    def print_summary(self):
+        print(f"Media: {self.counts['downloaded']} files downloaded ({self.downloaded_bytes / 1024**2:.1f} MB), "
+              f"{self.counts['deduplicated']} duplicates skipped, {self.counts['failed']} failed"
+              + (f", {self.counts['over_budget']} over the byte budget" if self.counts['over_budget'] else "")
+              + f" -> {self.directory}")
@@ -0,0 +1,300 @@
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Recorded posts used as post bodies (any export with a "text" field per post)
+_EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output example")
+SAMPLE_FILES = [
+    os.path.join(_EXAMPLE_DIR, "pol_posts.json"),
+    os.path.join(_EXAMPLE_DIR, "pol_filtered_20251021_000646.json"),
+]
+
+# Size of the synthetic board
+LIVE_THREADS = 150        # Threads in the catalog (a real /pol/ catalog has ~150)
+ARCHIVED_THREADS = 100    # Threads in the archive
+POSTS_PER_THREAD = 60     # Posts per thread, including the OP
+
+# Distinct images attached to posts (every third post has a file). Fewer images
+# than files, so images are reposted like on the real board
+MEDIA_FILES = 40
+
+# Poster countries, cycled through so country filters have something to find
+FLAGS = ["United States", "Denmark", "Sweden", "Germany", "United Kingdom", "Canada", "Brazil", "Finland"]
+
+# Same seed, same board: results stay comparable between runs
+SEED = 4
+
+# ============================================================================
+# 4CHAN MARKUP
+# ============================================================================
+
+def escape_html(text):
+    """HTML-escape text the way 4chan does"""
+    return (text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            .replace('"', '&quot;').replace("'", '&#039;'))
+
+def to_4chan_html(text):
+    """Rebuild the HTML 4chan serves for a plain-text post"""
+    lines = []
+    for line in text.split('\n'):
+        quote = re.fullmatch(r'>>(\d+)', line.strip())
+        if quote:
+            lines.append(f'<a href="#p{quote.group(1)}" class="quotelink">&gt;&gt;{quote.group(1)}</a>')
+        elif line.startswith('>'):
+            lines.append(f'<span class="quote">{escape_html(line)}</span>')
+        else:
+            lines.append(escape_html(line))
+    return '<br>'.join(lines)
+
+def load_sample_texts(paths=SAMPLE_FILES):
+    """Post texts from the first sample file that has any"""
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                texts = [post['text'] for post in json.load(f) if post.get('text')]
+        except (OSError, ValueError) as e:
+            print(f"Could not read sample file {path}: {e}")
+            continue
+        if texts:
+            return texts
+    # No recorded data at all, fall back to generated sentences
+    rng = random.Random(SEED)
+    words = ("the border vote election government policy asylum refugees president "
+             "thread anon post really think people country news time").split()
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(5, 60))) for _ in range(200)]
+
+# ============================================================================
+# SYNTHETIC BOARD
+# ============================================================================
+# Every response is rendered once up front, so serving costs next to nothing and
+# the benchmark measures the scrapers rather than the stand-in server:
+#   /pol/catalog.json, /pol/thread/<no>.json, /pol/archive.json   (official API)
+#   /pol/catalog, /pol/thread/<no>/, /pol/archive                  (HTML, for pychan)
+#   /pol/<tim>.jpg, /pol/<tim>s.jpg                                (files and thumbnails)
+
+def _api_post(no, resto, timestamp, text, rng, title=None, image=None):
+    post = {
+        "no": no,
+        "resto": resto,
+        "time": timestamp,
+        "now": time.strftime("%m/%d/%y(%a)%H:%M:%S", time.gmtime(timestamp)),
+        "name": "Anonymous",
+        "id": "%08x" % rng.getrandbits(32),
+        "country_name": FLAGS[no % len(FLAGS)],
+        "com": to_4chan_html(text),
+    }
+    if title:
+        post["sub"] = escape_html(title)
+    if image is not None:
+        post.update({"filename": f"image{no}", "ext": ".jpg", "tim": timestamp * 1000 + no % 1000,
+                     "fsize": len(image), "w": 800, "h": 600,
+                     "md5": base64.b64encode(hashlib.md5(image).digest()).decode('ascii')})
+    return post
+
+def _html_post(board, post):
+    """One post in the markup pychan parses"""
+    kind = "op" if post["resto"] == 0 else "reply"
+    file_html = ""
+    if "tim" in post:
+        file_html = (f'<div class="fileText">File: <a href="//i.4cdn.org/{board}/{post["tim"]}{post["ext"]}">'
+                     f'{post["filename"]}{post["ext"]}</a> (117 KB, {post["w"]}x{post["h"]})</div>')
+    return (
+        f'<div class="postContainer {kind}Container" id="pc{post["no"]}"><div class="post {kind}" id="p{post["no"]}">'
+        f'<div class="postInfo desktop"><span class="subject">{post.get("sub", "")}</span>'
+        + ('<img class="archivedIcon" alt="Archived">' if post.get("archived") else '') +
+        f'<span class="nameBlock"><span class="name">{post["name"]}</span>'
+        f'<span class="posteruid">(ID: <span>{post["id"]}</span>)</span>'
+        f'<span title="{post["country_name"]}" class="flag"></span></span>'
+        f'<span class="dateTime" data-utc="{post["time"]}">{post["now"]}</span></div>'
+        f'{file_html}<blockquote class="postMessage" id="m{post["no"]}">{post["com"]}</blockquote></div></div>'
+    )
+
+class MockBoard:
+    """A board's catalog, threads and archive, pre-rendered as JSON and HTML responses"""
+
+    def __init__(self, board="pol", live_threads=LIVE_THREADS, archived_threads=ARCHIVED_THREADS,
+                 posts_per_thread=POSTS_PER_THREAD, texts=None, now=None, seed=SEED):
+        self.board = board
+        self.now = int(now or time.time())
+        self.posts_per_thread = posts_per_thread
+        self.responses = {}
+        self.post_counts = {}
+        self.media = {}
+        rng = random.Random(seed)
+        media_rng = random.Random(seed + 1)
+        self.images = [media_rng.randbytes(media_rng.randint(2000, 20000)) for _ in range(MEDIA_FILES)]
+        self._media_rng = media_rng
+        texts = texts or load_sample_texts()
+        self.last_modified = formatdate(self.now, usegmt=True)
+
+        # Archived threads are older and numbered below the live ones
+        archived = [self._thread(100000 + i * 1000, self.now - 86400 + i * 60, texts, rng, archived=True)
+                    for i in range(archived_threads)]
+        live = [self._thread(900000 + i * 1000, self.now - 3600 + i * 10, texts, rng)
+                for i in range(live_threads)]
+
+        catalog = []
+        for page_start in range(0, len(live), 15):
+            threads = []
+            for posts in live[page_start:page_start + 15]:
+                entry = dict(posts[0])
+                entry.update({"replies": len(posts) - 1, "images": sum("tim" in p for p in posts[1:]),
+                              "last_modified": posts[-1]["time"], "last_replies": posts[1:][-5:]})
+                threads.append(entry)
+            catalog.append({"page": page_start // 15 + 1, "threads": threads})
+        self._add(f"/{board}/catalog.json", json.dumps(catalog), "application/json")
+        self._add(f"/{board}/archive.json", json.dumps([posts[0]["no"] for posts in archived]), "application/json")
+
+        catalog_js = {"threads": {str(posts[0]["no"]): {"sub": posts[0].get("sub", False)} for posts in live}}
+        self._add(f"/{board}/catalog", '<html><body><script type="text/javascript">var catalog = '
+                  + json.dumps(catalog_js) + ';</script></body></html>', "text/html")
+        rows = "".join(f'<tr><td>{posts[0]["no"]}</td><td class="teaser-col">{posts[0].get("sub", "")}</td></tr>'
+                       for posts in archived)
+        self._add(f"/{board}/archive", f'<html><body><table id="arc-list"><tbody>{rows}</tbody></table></body></html>',
+                  "text/html")
+
+    def _thread(self, no, op_time, texts, rng, archived=False):
+        posts = []
+        for i in range(self.posts_per_thread):
+            text = texts[rng.randrange(len(texts))]
+            title = texts[rng.randrange(len(texts))][:60].strip() if i == 0 else None
+            image = None
+            if (no + i) % 3 == 0:
+                image = self.images[self._media_rng.randrange(len(self.images))]
+            posts.append(_api_post(no + i, 0 if i == 0 else no, op_time + i * 30, text, rng, title, image))
+            if image is not None:
+                # Files are served from the same host; the thumbnail is a slice of the image
+                tim = posts[-1]["tim"]
+                self.media[f"/{self.board}/{tim}.jpg"] = image
+                self.media[f"/{self.board}/{tim}s.jpg"] = image[:1000]
+        if archived:
+            posts[0].update({"archived": 1, "archived_on": op_time + self.posts_per_thread * 30})
+        self._add(f"/{self.board}/thread/{no}.json", json.dumps({"posts": posts}), "application/json", len(posts))
+        html = "".join(_html_post(self.board, post) for post in posts)
+        self._add(f"/{self.board}/thread/{no}/", f'<html><body><div class="thread">{html}</div></body></html>',
+                  "text/html", len(posts))
+        return posts
+
+    def _add(self, path, body, content_type, posts=0):
+        self.responses[path] = (body.encode('utf-8'), content_type)
+        if posts:
+            self.post_counts[path] = posts
+
+# ============================================================================
+# HTTP SERVER
+# ============================================================================
+
+class MockServer:
+    """Serves a MockBoard (or a list of them) on localhost and counts requests and posts served"""
+
+    def __init__(self, board, port=0):
+        boards = board if isinstance(board, list) else [board]
+        by_name = {b.board: b for b in boards}
+        self.board = boards[0]
+        self.requests = 0
+        self.posts_served = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                board = by_name.get(path.split('/')[1], server.board)
+                with server._lock:
+                    server.requests += 1
+                if self.headers.get("If-Modified-Since") == board.last_modified:
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if path in board.media:
+                    self._send_media(board.media[path])
+                    return
+                # pychan asks for /thread/<no>/, tolerate the same path without the slash
+                response = board.responses.get(path) or board.responses.get(path + "/")
+                if response is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, content_type = response
+                with server._lock:
+                    server.posts_served += board.post_counts.get(path, board.post_counts.get(path + "/", 0))
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Last-Modified", board.last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_media(self, body):
+                # Only the "bytes=<start>-" form the media downloader sends
+                start = 0
+                ranged = re.fullmatch(r'bytes=(\d+)-', self.headers.get("Range", ""))
+                if ranged:
+                    start = int(ranged.group(1))
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                self.send_response(206 if ranged else 200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body) - start))
+                if ranged:
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                self.end_headers()
+                self.wfile.write(body[start:])
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self.host = f"127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.posts_served = 0
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    # Stand-alone server for trying the scrapers offline: set fourchan_fetch.API_BASE and
+    # request_scheduler.SITE_BASE to the printed URL
+    board = MockBoard()
+    server = MockServer(board, port=8765)
+    print(f"Serving /{board.board}/ ({LIVE_THREADS} live, {ARCHIVED_THREADS} archived threads, "
+          f"{POSTS_PER_THREAD} posts each) at {server.url}")
+    print("Press Ctrl+C to stop")
+    try:
+        server.start()
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopped")
@@ -0,0 +1,109 @@
+from datetime import datetime
+
+# ============================================================================
+# POST FILTERS
+# ============================================================================
+# A filter is a dict of conditions that must all hold, for example
+#
+#   {"country": "Denmark", "has_file": True}
+#   {"country": ["Denmark", "Sweden"], "poster_id": "a1b2c3d4", "op_only": True}
+#   {"start": datetime(2025, 10, 20, tzinfo=timezone.utc), "board": ["pol", "int"]}
+#
+# Conditions (left out or None = no restriction):
+#   start, end  - datetime or Unix time, start <= post time <= end
+#   board       - board name or list of names
+#   country     - country flag (or board flag) name, or a list of them
+#   poster_id   - poster ID, or a list of them
+#   has_file    - True: only posts with a file, False: only posts without one
+#   op_only     - True: only original posts (thread starters)
+#
+# PostFilter compiles the dict into predicates on the post's raw fields, run in
+# the order above: integer comparisons first, then set lookups on short strings.
+# The scripts check them before a post's HTML is cleaned or its text matched,
+# so most posts are rejected without being cleaned. The board is also checked
+# per thread (accepts_board), before anything is downloaded. Keyword matching
+# comes last and stays in the scripts.
+
+CONDITIONS = ("start", "end", "board", "country", "poster_id", "has_file", "op_only")
+
+# Where each condition's value is found in a post of the official API...
+API_FIELDS = {
+    'time': lambda post: post.get('time', 0),
+    'country': lambda post: post.get('country_name') or post.get('flag_name'),
+    'poster_id': lambda post: post.get('id'),
+    'has_file': lambda post: 'tim' in post,
+    'is_op': lambda post: post.get('resto', 0) == 0,
+}
+
+# ...and in an output record (api_backend.post_record / pychan_record)
+RECORD_FIELDS = {
+    'time': lambda record: datetime.fromisoformat(record['timestamp']).timestamp(),
+    'country': lambda record: record['poster_flag'],
+    'poster_id': lambda record: record['poster_id'],
+    'has_file': lambda record: record['has_file'],
+    'is_op': lambda record: record['is_original_post'],
+}
+
+def _unix(value):
+    return value.timestamp() if isinstance(value, datetime) else value
+
+def _as_set(value):
+    return {value} if isinstance(value, str) else set(value)
+
+class PostFilter:
+    """A filter dict compiled to an ordered list of predicates on raw post fields"""
+
+    def __init__(self, conditions=None, fields=API_FIELDS):
+        conditions = {name: value for name, value in (conditions or {}).items() if value is not None}
+        unknown = set(conditions) - set(CONDITIONS)
+        if unknown:
+            raise ValueError(f"Unknown filter condition(s): {', '.join(sorted(unknown))}")
+        self.conditions = conditions
+        self.boards = _as_set(conditions['board']) if 'board' in conditions else None
+        self.steps = []  # (description, predicate) in evaluation order
+
+        get_time = fields['time']
+        if 'start' in conditions:
+            start = _unix(conditions['start'])
+            self._add(f"time >= {conditions['start']}", lambda post: get_time(post) >= start)
+        if 'end' in conditions:
+            end = _unix(conditions['end'])
+            self._add(f"time <= {conditions['end']}", lambda post: get_time(post) <= end)
+        if 'country' in conditions:
+            countries = _as_set(conditions['country'])
+            get_country = fields['country']
+            self._add(f"country in {', '.join(sorted(countries))}", lambda post: get_country(post) in countries)
+        if 'poster_id' in conditions:
+            poster_ids = _as_set(conditions['poster_id'])
+            get_id = fields['poster_id']
+            self._add(f"poster ID in {', '.join(sorted(poster_ids))}", lambda post: get_id(post) in poster_ids)
+        if 'has_file' in conditions:
+            wanted = bool(conditions['has_file'])
+            get_file = fields['has_file']
+            self._add("has a file" if wanted else "has no file", lambda post: get_file(post) == wanted)
+        if conditions.get('op_only'):
+            self._add("original posts only", fields['is_op'])
+        self._predicates = [predicate for _, predicate in self.steps]
+
+    def _add(self, description, predicate):
+        self.steps.append((description, predicate))
+
+    @property
+    def active(self):
+        """True if the filter restricts anything"""
+        return bool(self._predicates) or self.boards is not None
+
+    def accepts_board(self, board):
+        """Thread-level check, done before a board's threads are downloaded"""
+        return self.boards is None or board in self.boards
+
+    def __call__(self, post):
+        for predicate in self._predicates:
+            if not predicate(post):
+                return False
+        return True
+
+    def describe(self):
+        """The conditions in the order they are checked"""
+        steps = [f"board in {', '.join(sorted(self.boards))}"] if self.boards is not None else []
+        return steps + [description for description, _ in self.steps]
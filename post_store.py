@@ -0,0 +1,191 @@
+import sqlite3
+from datetime import datetime, timezone
+
+from html_cleaner import clean_html
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Posts buffered before they are written in one transaction
+BATCH_SIZE = 500
+
+# ============================================================================
+# POST STORE
+# ============================================================================
+# Optional SQLite database holding every fetched post (not only the matches),
+# with an FTS5 full-text index over title and text. New keyword, time-range or
+# country questions are then answered from the database instead of a new crawl:
+#
+#   store = PostStore("posts.sqlite")
+#   store.search(keywords=["border", "asylum"], country="Denmark",
+#                start=datetime(2025, 10, 20, tzinfo=timezone.utc))
+#
+# Keyword search uses FTS5 word matching: "vote" finds "vote" and, with the
+# default prefix=True, also "votes" and "voter" - but not "devoted".
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    board TEXT NOT NULL,
+    post_no INTEGER NOT NULL,
+    thread_no INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    name TEXT,
+    poster_id TEXT,
+    country TEXT,
+    title TEXT,
+    text TEXT,
+    has_file INTEGER NOT NULL DEFAULT 0,
+    is_op INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (board, post_no)
+);
+CREATE INDEX IF NOT EXISTS posts_time ON posts (time);
+CREATE INDEX IF NOT EXISTS posts_country ON posts (country, time);
+CREATE INDEX IF NOT EXISTS posts_thread ON posts (board, thread_no);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5 (
+    title, text, content='posts', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+END;
+"""
+
+_COLUMNS = ("board", "post_no", "thread_no", "time", "name", "poster_id", "country",
+            "title", "text", "has_file", "is_op")
+
+def _fts_query(keywords, prefix):
+    """FTS5 MATCH expression: any of the keywords, each as a quoted phrase"""
+    terms = []
+    for keyword in keywords:
+        phrase = '"' + keyword.replace('"', '""') + '"'
+        terms.append(phrase + '*' if prefix else phrase)
+    return " OR ".join(terms)
+
+def _timestamp(value):
+    """Accept datetimes or Unix timestamps for time filters"""
+    return int(value.timestamp()) if isinstance(value, datetime) else int(value)
+
+class PostStore:
+    """SQLite post database with batched inserts and a full-text index"""
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        # WAL lets analysts query the database while a crawl is still writing to it
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+
+    # ------------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------------
+
+    def add(self, board, post_no, thread_no, time, name=None, poster_id=None, country=None,
+            title=None, text=None, has_file=False, is_op=False):
+        """Queue one post; posts already in the store are ignored"""
+        self._pending.append((board, post_no, thread_no, time, name, poster_id, country,
+                              title, text, int(bool(has_file)), int(bool(is_op))))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def add_api_posts(self, board, thread_no, posts):
+        """Queue the posts of an official API thread JSON ("posts" list)"""
+        for post in posts:
+            self.add(
+                board, post.get('no'), thread_no, post.get('time', 0),
+                name=post.get('name', 'Anonymous'),
+                poster_id=post.get('id'),
+                country=post.get('country_name') or post.get('flag_name'),
+                title=clean_html(post.get('sub', '')),
+                text=clean_html(post.get('com', '')),
+                has_file='tim' in post,
+                is_op=post.get('resto', 0) == 0,
+            )
+
+    def add_pychan_posts(self, posts):
+        """Queue pychan Post objects"""
+        for post in posts:
+            self.add(
+                post.thread.board, post.number, post.thread.number, int(post.timestamp.timestamp()),
+                name=post.poster.name,
+                poster_id=post.poster.id,
+                country=post.poster.flag,
+                title=post.thread.title if post.is_original_post else None,
+                text=post.text,
+                has_file=post.file is not None,
+                is_op=post.is_original_post,
+            )
+
+    def flush(self):
+        """Write queued posts in a single transaction"""
+        if not self._pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR IGNORE INTO posts ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                self._pending)
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ------------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------------
+
+    def search(self, keywords=None, start=None, end=None, country=None, board=None,
+               poster_id=None, prefix=True, limit=None):
+        """Posts matching any keyword (all posts if none) and the given filters, oldest first"""
+        self.flush()
+        conditions = []
+        params = []
+        if keywords:
+            conditions.append("posts.id IN (SELECT rowid FROM posts_fts WHERE posts_fts MATCH ?)")
+            params.append(_fts_query(keywords, prefix))
+        if start is not None:
+            conditions.append("posts.time >= ?")
+            params.append(_timestamp(start))
+        if end is not None:
+            conditions.append("posts.time <= ?")
+            params.append(_timestamp(end))
+        if country is not None:
+            conditions.append("posts.country = ?")
+            params.append(country)
+        if board is not None:
+            conditions.append("posts.board = ?")
+            params.append(board)
+        if poster_id is not None:
+            conditions.append("posts.poster_id = ?")
+            params.append(poster_id)
+
+        sql = "SELECT * FROM posts"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY posts.time"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def count(self):
+        self.flush()
+        return self.connection.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+def format_time(unix_timestamp):
+    """UTC time of a stored post, for display"""
+    return datetime.fromtimestamp(unix_timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,34 @@
+import os
+import time
+from post_store import PostStore, format_time
+
+# Database written by one of the scrapers (POST_STORE / post_store_path)
+database = os.path.join("output_official_api", "pol_posts.sqlite")
+
+# Search settings (None = no filter)
+keywords = ["immigrants", "border", "refugees", "asylum"]
+start_date = None  # e.g. datetime(2025, 10, 21, tzinfo=timezone.utc)
+end_date = None
+country = None     # e.g. "Denmark"
+board = None       # e.g. "pol"
+limit = 50         # Posts printed
+
+if not os.path.exists(database):
+    print(f"Error: {database} not found, enable the post store in a scraper first")
+    raise SystemExit(1)
+
+with PostStore(database) as store:
+    print(f"Searching {store.count()} stored posts in {database}...")
+    started = time.perf_counter()
+    posts = store.search(keywords=keywords, start=start_date, end=end_date,
+                         country=country, board=board)
+    elapsed = time.perf_counter() - started
+
+print(f"\n✅ {len(posts)} matching posts ({elapsed * 1000:.1f} ms)\n")
+for post in posts[:limit]:
+    flag = f" ({post['country']})" if post['country'] else ""
+    print(f"/{post['board']}/ #{post['post_no']} - {format_time(post['time'])}{flag}")
+    print(f"  https://boards.4chan.org/{post['board']}/thread/{post['thread_no']}#p{post['post_no']}")
+    print(f"  {(post['text'] or '')[:100]}...\n")
+if len(posts) > limit:
+    print(f"... and {len(posts) - limit} more")
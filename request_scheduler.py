@@ -0,0 +1,236 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from run_metrics import get_metrics
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Requests per second and burst size per host. The 4chan API rules ask for no
+# more than one request per second; pychan scrapes the HTML site at the same pace.
+HOST_LIMITS = {
+    "a.4cdn.org": (1.0, 1),
+    "boards.4chan.org": (1.0, 1),
+}
+
+# Hosts not listed above (mirrors, local test servers, ...)
+DEFAULT_LIMIT = (5.0, 5)
+
+# Retries for a request answered with 429 or 5xx (or a connection error)
+MAX_RETRIES = 3
+
+# Backoff when the server gives no Retry-After: 2s, 4s, 8s, ... capped
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+# ============================================================================
+# TOKEN BUCKET
+# ============================================================================
+
+class TokenBucket:
+    """Classic token bucket: refills at rate tokens/second up to burst tokens"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.configured_rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+# ============================================================================
+# REQUEST SCHEDULER
+# ============================================================================
+# Every request first takes a token from its host's bucket. Requests waiting
+# for the same host are granted in priority order (lower value first), so the
+# most useful threads are fetched first when the budget is tight. A 429 or 5xx
+# pauses the host (Retry-After when given, exponential backoff otherwise) and
+# halves its rate; successful requests slowly bring the rate back.
+
+def _retry_after_seconds(value):
+    """Parse a Retry-After header (seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RequestScheduler:
+    """Shared per-host rate limiter with priorities and adaptive backoff"""
+
+    def __init__(self, host_limits=None, default_limit=DEFAULT_LIMIT, max_retries=MAX_RETRIES):
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self.default_limit = default_limit
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._waiting = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.host_limits.get(host, self.default_limit)
+            bucket = self._buckets[host] = TokenBucket(rate, burst)
+            self._waiting[host] = []
+        return bucket
+
+    @contextmanager
+    def priority(self, value):
+        """Default priority for requests made by this thread inside the block"""
+        previous = getattr(self._local, "priority", 0)
+        self._local.priority = value
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def acquire(self, url, priority=None):
+        """Block until a request to url's host may be sent"""
+        if priority is None:
+            priority = getattr(self._local, "priority", 0)
+        host = urlsplit(url).netloc
+        with get_metrics().timer("wait"), self._condition:
+            bucket = self._bucket(host)
+            waiting = self._waiting[host]
+            entry = (priority, next(self._sequence))
+            heapq.heappush(waiting, entry)
+            while True:
+                now = time.monotonic()
+                delay = bucket.wait_time(now)
+                if waiting[0] == entry and delay == 0:
+                    heapq.heappop(waiting)
+                    bucket.tokens -= 1
+                    self._condition.notify_all()
+                    return
+                # Woken early when someone else takes a token or a request completes
+                self._condition.wait(timeout=delay if delay > 0 else None)
+
+    def report(self, url, status, retry_after=None):
+        """Feed a response status back into the host's bucket"""
+        host = urlsplit(url).netloc
+        with self._condition:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            if status is None or status == 429 or status >= 500:
+                bucket.failures += 1
+                delay = _retry_after_seconds(retry_after)
+                if delay is None:
+                    delay = min(BACKOFF_MAX, BACKOFF_BASE ** bucket.failures)
+                bucket.blocked_until = max(bucket.blocked_until, now + delay)
+                bucket.rate = max(bucket.configured_rate / 16, bucket.rate / 2)
+                print(f"Backing off {host} for {delay:.0f}s (status {status}), "
+                      f"rate now {bucket.rate:.2f} req/s")
+            else:
+                bucket.failures = 0
+                if bucket.rate < bucket.configured_rate:
+                    bucket.rate = min(bucket.configured_rate, bucket.rate * 1.1)
+            self._condition.notify_all()
+
+    def get(self, session, url, priority=None, **kwargs):
+        """session.get through the scheduler, retrying 429/5xx/connection errors"""
+        metrics = get_metrics()
+        for attempt in range(self.max_retries + 1):
+            self.acquire(url, priority)
+            try:
+                with metrics.timer("fetch"):
+                    response = session.get(url, **kwargs)
+            except requests.ConnectionError:
+                metrics.count("request_errors")
+                self.report(url, None)
+                if attempt == self.max_retries:
+                    raise
+                continue
+            metrics.count("requests")
+            metrics.count("bytes", len(response.content))
+            if response.status_code == 429 or response.status_code >= 500:
+                metrics.count("request_errors")
+                self.report(url, response.status_code, response.headers.get("Retry-After"))
+                if attempt < self.max_retries:
+                    continue
+            else:
+                self.report(url, response.status_code)
+            return response
+
+_scheduler = None
+
+def get_scheduler():
+    """Return the process-wide scheduler, creating it on first use"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RequestScheduler()
+    return _scheduler
+
+def share_rate(fraction):
+    """Replace the process-wide scheduler with one allowed a fraction of every host's rate
+
+    For several processes crawling at once: with N worker processes each gets 1/N,
+    so together they stay within HOST_LIMITS.
+    """
+    global _scheduler
+    limits = {host: (rate * fraction, burst) for host, (rate, burst) in HOST_LIMITS.items()}
+    _scheduler = RequestScheduler(limits, (DEFAULT_LIMIT[0] * fraction, DEFAULT_LIMIT[1]))
+    return _scheduler
+
+# ============================================================================
+# PYCHAN INTEGRATION
+# ============================================================================
+
+# Site pychan scrapes. Requests to it are sent here instead, so pychan can be
+# pointed at a mirror or a local test server (see mock_4chan_server.py)
+PYCHAN_SITE = "https://boards.4chan.org"
+SITE_BASE = PYCHAN_SITE
+
+def schedule_pychan(fourchan, scheduler=None):
+    """Route a pychan FourChan instance's HTTP requests through the scheduler
+
+    pychan has no hook for this, so its request helper is replaced. pychan's own
+    one-request-per-second throttle is turned off since the scheduler enforces
+    the same limit per host, with priorities and backoff on top.
+    """
+    scheduler = scheduler or get_scheduler()
+    session = requests.Session()
+
+    def request_helper(url, *, headers=None, params=None):
+        h = {} if headers is None else headers
+        if SITE_BASE != PYCHAN_SITE and url.startswith(PYCHAN_SITE):
+            url = SITE_BASE + url[len(PYCHAN_SITE):]
+        response = scheduler.get(session, url, headers={"User-Agent": fourchan._agent, **h}, params=params)
+        if response.status_code == 200:
+            return response
+        fourchan._logger.error(f"Unexpected status code {response.status_code} when fetching {url}")
+        if fourchan._raise_http_exceptions:
+            response.raise_for_status()
+        return None
+
+    fourchan._request_helper = request_helper
+    fourchan._throttle_request = lambda: None
+    return fourchan
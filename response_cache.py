@@ -0,0 +1,169 @@
+import gzip
+import json
+import os
+import pickle
+import threading
+import time
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Where cached threads are stored
+CACHE_DIR = os.path.join(".cache", "threads")
+
+# Seconds a live (not archived, not closed) thread stays fresh
+LIVE_TTL = 120
+
+# Total size of the cache on disk, least recently used threads are evicted first
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+# Threads are stored gzip-compressed, one file per thread:
+#   .cache/threads/pol/519384195.api.gz      (official API thread JSON, the body as downloaded)
+#   .cache/threads/pol/519384195.pychan.gz   (pychan Post objects)
+#
+# The API body is kept as it was downloaded, not decoded: msgspec only decodes
+# the fields in api_decode.py, and a decoded copy would lack any field added
+# there later - forever, for threads that never expire.
+#
+# Archived and closed threads can never change again, so they never expire.
+# Live threads expire after LIVE_TTL seconds. index.json keeps size and last
+# access time of every entry for LRU eviction.
+
+class ResponseCache:
+    """Size-bounded on-disk cache of thread documents keyed by board and thread number"""
+
+    def __init__(self, directory=CACHE_DIR, live_ttl=LIVE_TTL, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.live_ttl = live_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, "index.json")
+        self._index = {}
+        self._dirty = 0
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read cache index, starting with an empty cache: {e}")
+        self._total = sum(entry["size"] for entry in self._index.values())
+
+    def _key(self, board, thread_no, kind):
+        return f"{board}/{thread_no}.{kind}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".gz")
+
+    def get(self, board, thread_no, kind="api"):
+        """Cached document for a thread (bytes for kind "api"), or None if missing or expired"""
+        key = self._key(board, thread_no, kind)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if not entry["immutable"] and now - entry["stored"] > self.live_ttl:
+                self._remove(key)
+                self.misses += 1
+                return None
+            entry["accessed"] = now
+            self._dirty += 1
+
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = gzip.decompress(f.read())
+            if kind == "pychan":
+                # Corrupt, or written by a pychan version whose classes have changed since
+                data = pickle.loads(data)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError, ValueError) as e:
+            print(f"Dropping unreadable cache entry {key}: {e}")
+            with self._lock:
+                self._remove(key)
+                self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def put(self, board, thread_no, data, immutable=False, kind="api"):
+        """Store a thread document (the response bytes for kind "api"); immutable entries never expire"""
+        key = self._key(board, thread_no, kind)
+        raw = pickle.dumps(data) if kind == "pychan" else data
+        # Fast compression: cache reads and writes should cost much less than a request
+        compressed = gzip.compress(raw, compresslevel=1)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            previous = self._index.get(key)
+            if previous:
+                self._total -= previous["size"]
+            now = time.time()
+            self._index[key] = {"size": len(compressed), "stored": now, "accessed": now,
+                                "immutable": bool(immutable)}
+            self._total += len(compressed)
+            self._dirty += 1
+            if self._total > self.max_bytes:
+                self._evict()
+            if self._dirty >= 100:
+                self._save_index()
+
+    def _remove(self, key):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total -= entry["size"]
+            self._dirty += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes again"""
+        for key in sorted(self._index, key=lambda k: self._index[k]["accessed"]):
+            if self._total <= self.max_bytes * 0.9:
+                break
+            self._remove(key)
+
+    def _save_index(self):
+        # Several processes may share the cache (sharded crawls): keep the entries
+        # they stored since this index was read, instead of overwriting them
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                on_disk = json.load(f)
+        except (OSError, ValueError):
+            on_disk = {}
+        for key, entry in on_disk.items():
+            if key not in self._index and os.path.exists(self._path(key)):
+                self._index[key] = entry
+                self._total += entry["size"]
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+        self._dirty = 0
+
+    def save(self):
+        """Write the index to disk (call once at the end of a run)"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+def is_immutable_thread(thread_data):
+    """True for official API thread JSON of an archived or closed thread"""
+    posts = thread_data.get('posts') if thread_data else None
+    if not posts:
+        return False
+    return bool(posts[0].get('archived') or posts[0].get('closed'))
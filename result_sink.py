@@ -0,0 +1,218 @@
+import gzip
+import json
+import os
+from datetime import datetime
+
+# ============================================================================
+# STREAMING RESULT SINK
+# ============================================================================
+# Matches are appended to a JSON Lines file (one post per line) as soon as they
+# are found instead of being collected in a list and dumped at the end, so
+# memory stays flat and a crash only loses the last few unflushed matches.
+#
+# A run manifest next to the output remembers which threads were finished and
+# how far the output file was valid at that point. If the script is interrupted
+# the next run truncates the output back to that point and skips the finished
+# threads, so nothing is lost and nothing is written twice.
+
+# Matches buffered before they are pushed to disk
+FLUSH_EVERY = 50
+
+# Finished threads between run manifest saves (each save rewrites the whole list)
+SAVE_EVERY = 25
+
+class JsonlSink:
+    """Append-only JSON Lines writer with periodic flushing and optional gzip"""
+
+    def __init__(self, path, compress=False, flush_every=FLUSH_EVERY, resume_offset=None):
+        self.path = path
+        self.compress = compress
+        self.flush_every = flush_every
+        self.count = 0
+        self._pending = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume_offset is not None and os.path.exists(path):
+            # Drop anything written after the last checkpoint (it will be redone)
+            self._raw = open(path, 'r+b')
+            self._raw.truncate(resume_offset)
+            self._raw.seek(resume_offset)
+        else:
+            self._raw = open(path, 'wb')
+        self._stream = None if compress else self._raw
+
+    def write(self, record):
+        """Append one match"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        if self._stream is None:
+            # Each flush closes a gzip member, concatenated members are still one valid .gz file.
+            # The next member is only started here so checkpoints always fall between members.
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._stream.write(line.encode('utf-8'))
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Push buffered matches to disk"""
+        if self.compress and self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._raw.flush()
+        self._pending = 0
+
+    def checkpoint(self):
+        """Flush and return the byte offset up to which the file is complete"""
+        self.flush()
+        return self._raw.tell()
+
+    def close(self):
+        if self._raw.closed:
+            return
+        if self.compress and self._stream is not None:
+            self._stream.close()
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class MemorySink:
+    """Collects matches in a list, for callers that want them in memory"""
+
+    def __init__(self):
+        self.records = []
+        self.count = 0
+
+    def write(self, record):
+        self.records.append(record)
+        self.count += 1
+
+    def flush(self):
+        pass
+
+    def checkpoint(self):
+        return self.count
+
+    def close(self):
+        pass
+
+def read_jsonl(path):
+    """Yield the records of a (possibly gzipped) JSON Lines file one at a time"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# ============================================================================
+# RUN MANIFEST
+# ============================================================================
+
+class RunManifest:
+    """Progress of one scraping run, saved atomically every few checkpoints"""
+
+    def __init__(self, path, save_every=SAVE_EVERY):
+        self.path = path
+        self.save_every = save_every
+        self._dirty = 0
+        self.data = {
+            "status": "new",
+            "started": None,
+            "output": None,
+            "compress": False,
+            "offset": 0,
+            "matches": 0,
+            "done_threads": [],
+        }
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.data.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Could not read run manifest {path}, starting a new run: {e}")
+        self._done = set(self.data["done_threads"])
+
+    @property
+    def resumable(self):
+        """True if a previous run was interrupted and its output still exists"""
+        return (self.data["status"] == "running" and self.data["output"] is not None
+                and os.path.exists(self.data["output"]))
+
+    def open_sink(self, output_dir, prefix, compress=False):
+        """Resume the interrupted run's output, or start a new timestamped one"""
+        if self.resumable:
+            print(f"Resuming interrupted run: {len(self._done)} threads already done, "
+                  f"{self.data['matches']} matches in {self.data['output']}")
+            sink = JsonlSink(self.data["output"], compress=self.data["compress"],
+                             resume_offset=self.data["offset"])
+            sink.count = self.data["matches"]
+            return sink
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = ".jsonl.gz" if compress else ".jsonl"
+        path = os.path.join(output_dir, f"{prefix}_{timestamp}{extension}")
+        self._done = set()
+        self.data.update({
+            "status": "running",
+            "started": timestamp,
+            "output": path,
+            "compress": compress,
+            "offset": 0,
+            "matches": 0,
+        })
+        sink = JsonlSink(path, compress=compress)
+        self.save()
+        return sink
+
+    def is_done(self, thread_no):
+        return thread_no in self._done
+
+    def mark_done(self, thread_no, sink):
+        """Record a finished thread together with the output position after it, True if saved to disk"""
+        self.data["offset"] = sink.checkpoint()
+        self.data["matches"] = sink.count
+        self._done.add(thread_no)
+        self._dirty += 1
+        if self._dirty >= self.save_every:
+            self.save()
+            return True
+        return False
+
+    def finish(self, sink):
+        """Mark the run complete so the next run starts fresh"""
+        self.data["offset"] = sink.checkpoint()
+        self.data["matches"] = sink.count
+        self.data["status"] = "complete"
+        self.save()
+
+    def save(self):
+        """Write the manifest (also call it when a run is interrupted, to keep the last checkpoints)"""
+        self.data["done_threads"] = sorted(self._done)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = 0
+
+# ============================================================================
+# TEXT REPORT
+# ============================================================================
+
+def write_text_report(jsonl_path, txt_path, header, format_post):
+    """Write the readable report by streaming the JSONL output, one post at a time"""
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        f.write(header)
+        for i, post in enumerate(read_jsonl(jsonl_path), 1):
+            f.write(format_post(i, post))
+
+def report_path(jsonl_path, extension='.txt'):
+    """The .txt report (or other file) that belongs next to a .jsonl / .jsonl.gz output"""
+    base = jsonl_path[:-len('.gz')] if jsonl_path.endswith('.gz') else jsonl_path
+    return base[:-len('.jsonl')] + extension
@@ -0,0 +1,205 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Seconds between two progress lines
+PROGRESS_INTERVAL = 5.0
+
+# Stages that wait on the network; everything else is CPU work in this process
+NETWORK_STAGES = ("wait", "fetch")
+
+# ============================================================================
+# RUN METRICS
+# ============================================================================
+# Counters (requests, bytes, threads, posts, matches, ...) and stage timers
+# shared by everything in the process. The request scheduler records "wait"
+# (queued for a rate-limit token) and "fetch" (HTTP round trip), the scrapers
+# record "decode"/"parse", "clean", "match" and "write".
+#
+# Stage times are exclusive: a timer nested in another (a fetch inside pychan's
+# get_posts) is subtracted from the outer one, so the stages add up to the time
+# actually spent and show whether a run is network-bound or CPU-bound. Times are
+# summed over worker threads, so with several workers they exceed the wall time.
+
+class Metrics:
+    """Thread-safe counters and exclusive stage timers for one run"""
+
+    def __init__(self, progress_interval=PROGRESS_INTERVAL):
+        self.started = time.time()
+        self.progress_interval = progress_interval
+        self.counters = {}
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_progress = time.monotonic()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, stage, seconds):
+        """Add seconds to a stage"""
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = [0.0, 0, 0.0]
+            entry[0] += seconds
+            entry[1] += 1
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the block as stage, minus the time of timers nested inside it"""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.observe(stage, elapsed - nested)
+
+    # ------------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------------
+
+    def elapsed(self):
+        return time.time() - self.started
+
+    def bottleneck(self):
+        """'network', 'rate limit' or 'CPU', from where most stage time went"""
+        with self._lock:
+            stages = {name: entry[0] for name, entry in self.stages.items()}
+        total = sum(stages.values())
+        if not total:
+            return None
+        network = sum(stages.get(name, 0.0) for name in NETWORK_STAGES)
+        if network < total / 2:
+            return "CPU"
+        return "rate limit" if stages.get("wait", 0.0) > stages.get("fetch", 0.0) else "network"
+
+    def progress(self, total_threads=None, force=False):
+        """Print a one-line status at most once per progress_interval"""
+        now = time.monotonic()
+        if not force and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        with self._lock:
+            counters = dict(self.counters)
+        elapsed = max(self.elapsed(), 1e-9)
+        threads = f"{counters.get('threads', 0)}" + (f"/{total_threads}" if total_threads else "")
+        print(f"[{time.strftime('%H:%M:%S')}] threads {threads} | posts {counters.get('posts', 0)} | "
+              f"matches {counters.get('matches', 0)} | {counters.get('requests', 0) / elapsed:.1f} req/s | "
+              f"{counters.get('bytes', 0) / 1024 / 1024:.1f} MB | bound: {self.bottleneck() or '-'}")
+
+    def summary(self):
+        """Counters, per-stage times and rates as a JSON-ready dict"""
+        elapsed = self.elapsed()
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {name: list(entry) for name, entry in self.stages.items()}
+        stage_total = sum(entry[0] for entry in stages.values()) or 1.0
+        return {
+            "started": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            "elapsed_seconds": round(elapsed, 3),
+            "counters": counters,
+            "stages": {
+                name: {
+                    "seconds": round(total, 4),
+                    "calls": calls,
+                    "avg_ms": round(total / calls * 1000, 3) if calls else 0.0,
+                    "max_ms": round(longest * 1000, 3),
+                    "share": round(total / stage_total, 4),
+                }
+                for name, (total, calls, longest) in sorted(stages.items(), key=lambda item: -item[1][0])
+            },
+            "rates": {
+                "posts_per_sec": round(counters.get("posts", 0) / elapsed, 2) if elapsed else 0.0,
+                "requests_per_sec": round(counters.get("requests", 0) / elapsed, 2) if elapsed else 0.0,
+            },
+            "bottleneck": self.bottleneck(),
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"Run time: {summary['elapsed_seconds']:.1f}s, "
+              f"{summary['rates']['posts_per_sec']:.0f} posts/s, {summary['rates']['requests_per_sec']:.1f} req/s")
+        for name, stage in summary["stages"].items():
+            print(f"  {name + ':':<8} {stage['seconds']:8.2f}s  {stage['share'] * 100:5.1f}%  "
+                  f"({stage['calls']} calls, avg {stage['avg_ms']:.2f} ms)")
+        if summary["bottleneck"]:
+            print(f"Mostly {summary['bottleneck']}-bound")
+
+    def save_summary(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def prometheus_text(self):
+        """Counters and stage timers in the Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {name: list(entry) for name, entry in self.stages.items()}
+        lines = []
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE fourchan_{name}_total counter")
+            lines.append(f"fourchan_{name}_total {value}")
+        lines.append("# TYPE fourchan_stage_seconds_total counter")
+        for name, (total, _, _) in sorted(stages.items()):
+            lines.append(f'fourchan_stage_seconds_total{{stage="{name}"}} {total:.6f}')
+        lines.append("# TYPE fourchan_stage_calls_total counter")
+        for name, (_, calls, _) in sorted(stages.items()):
+            lines.append(f'fourchan_stage_calls_total{{stage="{name}"}} {calls}')
+        lines.append("# TYPE fourchan_uptime_seconds gauge")
+        lines.append(f"fourchan_uptime_seconds {self.elapsed():.3f}")
+        return "\n".join(lines) + "\n"
+
+_metrics = None
+
+def get_metrics():
+    """Return the process-wide metrics, creating them on first use"""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
+
+# ============================================================================
+# METRICS ENDPOINT
+# ============================================================================
+
+def serve_metrics(port, metrics=None, host="127.0.0.1"):
+    """Serve /metrics in Prometheus text format from a background thread"""
+    metrics = metrics or get_metrics()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics available at http://{host}:{port}/metrics")
+    return server
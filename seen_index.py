@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Post numbers per bitmap chunk (one bit each, 8 KB per chunk). Post numbers of a
+# board are consecutive, so a run touching 150,000 posts needs about 3 chunks
+CHUNK_BITS = 1 << 16
+CHUNK_BYTES = CHUNK_BITS // 8
+
+# ============================================================================
+# SEEN-POST INDEX
+# ============================================================================
+# Remembers which posts earlier runs already cleaned and matched, so the next
+# run skips them and only reports new matches. Each board is a bitmap over post
+# numbers, stored as the 8 KB chunks that contain at least one seen post - exact
+# (no false positives like a Bloom filter) and small, since a board's posts are
+# numbered without gaps. One file per board:
+#
+#   SEEN1 <signature>\n                       settings the posts were matched with
+#   <chunk number, 4 bytes big-endian><8192 bytes of bits>
+#   ...
+#
+# The signature stands for the keywords and filters. When they change, posts
+# seen before may match now, so the board's index starts over.
+#
+# A batch run stages the posts of a thread, keeps them once the thread is
+# finished and commits them once the run manifest recording the thread is
+# saved, i.e. its matches can no longer be cut off on resume. A crash therefore
+# never leaves a post marked as seen whose match was lost.
+
+def settings_signature(*settings):
+    """Short fingerprint of the settings posts were matched with"""
+    text = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+class SeenIndex:
+    """Per-board bitmaps of post numbers processed by earlier runs"""
+
+    def __init__(self, directory, signature=""):
+        self.directory = directory
+        self.signature = signature
+        self.boards = {}
+        self.changed = set()
+        self.staged = []
+        self.kept = []
+
+    def _path(self, board):
+        return os.path.join(self.directory, f"{board}.seen")
+
+    def _load(self, board):
+        chunks = {}
+        path = self._path(board)
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    header = f.readline().decode('ascii').split()
+                    if header[1:] == ([self.signature] if self.signature else []):
+                        while True:
+                            key = f.read(4)
+                            if len(key) < 4:
+                                break
+                            chunks[int.from_bytes(key, 'big')] = bytearray(f.read(CHUNK_BYTES))
+                    else:
+                        print(f"Keywords or filters changed since /{board}/'s seen-post index was written, starting it over")
+                        self.changed.add(board)
+            except (OSError, ValueError, IndexError) as e:
+                print(f"Could not read seen-post index {path}, starting fresh: {e}")
+                chunks = {}
+        return chunks
+
+    def _chunks(self, board):
+        chunks = self.boards.get(board)
+        if chunks is None:
+            chunks = self.boards[board] = self._load(board)
+        return chunks
+
+    def seen(self, board, post_no):
+        """True if an earlier run (or this one) already processed the post"""
+        chunk_no, bit = divmod(post_no, CHUNK_BITS)
+        chunk = self._chunks(board).get(chunk_no)
+        return chunk is not None and bool(chunk[bit >> 3] & (1 << (bit & 7)))
+
+    def add(self, board, post_no):
+        """Record a post as processed"""
+        chunk_no, bit = divmod(post_no, CHUNK_BITS)
+        chunks = self._chunks(board)
+        chunk = chunks.get(chunk_no)
+        if chunk is None:
+            chunk = chunks[chunk_no] = bytearray(CHUNK_BYTES)
+        chunk[bit >> 3] |= 1 << (bit & 7)
+        self.changed.add(board)
+
+    def stage(self, board, post_no):
+        """Record a post as processed once commit() is called"""
+        self.staged.append((board, post_no))
+
+    def keep(self):
+        """Hold the staged posts for the next commit(), e.g. when their thread is finished"""
+        self.kept += self.staged
+        self.staged = []
+
+    def commit(self):
+        """Add the kept posts, e.g. when the manifest recording their threads is saved"""
+        for board, post_no in self.kept:
+            self.add(board, post_no)
+        self.kept = []
+
+    def discard(self):
+        """Forget the staged posts, e.g. when their thread failed"""
+        self.staged = []
+
+    def count(self, board):
+        """Number of posts recorded for a board"""
+        return sum(bin(int.from_bytes(chunk, 'big')).count('1') for chunk in self._chunks(board).values())
+
+    def save(self):
+        """Write the boards changed since loading (not staged or kept posts), atomically so a crash never leaves a half-written file"""
+        if not self.changed:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for board in self.changed:
+            path = self._path(board)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(f"SEEN1 {self.signature}\n".encode('ascii'))
+                for chunk_no in sorted(self.boards.get(board, {})):
+                    f.write(chunk_no.to_bytes(4, 'big'))
+                    f.write(self.boards[board][chunk_no])
+            os.replace(tmp_path, path)
+        self.changed.clear()
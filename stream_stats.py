@@ -0,0 +1,213 @@
+import base64
+import hashlib
+import heapq
+import json
+import math
+from datetime import datetime, timezone
+from operator import itemgetter
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# HyperLogLog precision: 2**14 one-byte registers (16 KB per counter), ~0.8% error
+HLL_PRECISION = 14
+
+# Threads tracked for the busiest-threads list. Counts of the busiest threads stay
+# exact, memory does not grow with the number of threads (Space-Saving algorithm)
+THREAD_CAPACITY = 1000
+
+# Entries in each top list of the summary
+TOP_K = 10
+
+# ============================================================================
+# SKETCHES
+# ============================================================================
+
+class HyperLogLog:
+    """Approximate number of distinct values in fixed memory"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+        h = int.from_bytes(digest, 'big')
+        bits = 64 - self.precision
+        index = h >> bits
+        # Position of the first 1 bit in the remaining bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small counts: linear counting is far more accurate
+            return round(m * math.log(m / zeros))
+        return round(estimate)
+
+class TopCounter:
+    """Counts of the most frequent keys in fixed memory (Space-Saving)
+
+    When full, a new key replaces the key with the smallest count and inherits
+    that count, so counts can only be overestimated, and only for rare keys.
+    """
+
+    def __init__(self, capacity=THREAD_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, key, n=1):
+        counts = self.counts
+        if key in counts:
+            counts[key] += n
+        elif len(counts) < self.capacity:
+            counts[key] = n
+        else:
+            smallest = min(counts, key=counts.get)
+            counts[key] = counts.pop(smallest) + n
+
+    def merge(self, other):
+        for key, n in other.counts.items():
+            self.add(key, n)
+
+    def top(self, k=TOP_K):
+        return heapq.nlargest(k, self.counts.items(), key=itemgetter(1))
+
+# ============================================================================
+# MATCH STATISTICS
+# ============================================================================
+# Updated once per match while the run streams its output, so the summary needs
+# no second pass over the results and memory stays the same for 30 or 3,000
+# threads: keywords, countries and hours are small by nature, threads are kept
+# in a TopCounter and distinct threads/posters are HyperLogLog estimates.
+
+def _hour(timestamp):
+    """UTC hour bucket ("2025-10-21 14:00") of a Unix time, datetime or str(datetime)"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    elif not isinstance(timestamp, datetime):
+        timestamp = datetime.fromtimestamp(timestamp, timezone.utc)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.strftime('%Y-%m-%d %H:00')
+
+def _add_counts(target, source):
+    for key, n in source.items():
+        target[key] = target.get(key, 0) + n
+
+class PostStats:
+    """Aggregate statistics of matched posts, updated one post at a time"""
+
+    def __init__(self, top_k=TOP_K):
+        self.top_k = top_k
+        self.matches = 0
+        self.original_posts = 0
+        self.posts_with_files = 0
+        self.keywords = {}
+        self.countries = {}
+        self.hours = {}
+        self.threads = TopCounter()
+        self.distinct_threads = HyperLogLog()
+        self.distinct_posters = HyperLogLog()
+
+    def add(self, keywords, country=None, thread=None, poster_id=None, timestamp=None,
+            is_op=False, has_file=False):
+        """Count one matched post"""
+        self.matches += 1
+        self.original_posts += bool(is_op)
+        self.posts_with_files += bool(has_file)
+        for keyword in keywords:
+            self.keywords[keyword] = self.keywords.get(keyword, 0) + 1
+        if country is not None:
+            self.countries[country] = self.countries.get(country, 0) + 1
+        if timestamp is not None:
+            hour = _hour(timestamp)
+            self.hours[hour] = self.hours.get(hour, 0) + 1
+        if thread is not None:
+            self.threads.add(thread)
+            self.distinct_threads.add(thread)
+            # Poster IDs are only unique within a thread
+            if poster_id:
+                self.distinct_posters.add(f"{thread}/{poster_id}")
+
+    def add_record(self, record):
+        """Count one match in the archived script's output format"""
+        poster_id = record.get('poster_id')
+        self.add(record['matched_keywords'], country=record.get('poster_flag'),
+                 thread=f"{record['thread_board']}/{record['thread_number']}",
+                 poster_id=None if poster_id == "No ID" else poster_id,
+                 timestamp=record.get('timestamp'), is_op=record.get('is_original_post'),
+                 has_file=record.get('has_file'))
+
+    def merge(self, other):
+        """Add another PostStats (e.g. from another worker) into this one"""
+        self.matches += other.matches
+        self.original_posts += other.original_posts
+        self.posts_with_files += other.posts_with_files
+        _add_counts(self.keywords, other.keywords)
+        _add_counts(self.countries, other.countries)
+        _add_counts(self.hours, other.hours)
+        self.threads.merge(other.threads)
+        self.distinct_threads.merge(other.distinct_threads)
+        self.distinct_posters.merge(other.distinct_posters)
+
+    def top(self, counts, k=None):
+        """The k largest entries of a count dict, largest first"""
+        return heapq.nlargest(k or self.top_k, counts.items(), key=itemgetter(1))
+
+    def summary(self):
+        """All aggregates as a JSON-ready dict"""
+        return {
+            "matches": self.matches,
+            "original_posts": self.original_posts,
+            "posts_with_files": self.posts_with_files,
+            "distinct_threads": self.distinct_threads.count(),
+            "distinct_posters": self.distinct_posters.count(),
+            "keywords": dict(self.top(self.keywords, len(self.keywords))),
+            "countries": dict(self.top(self.countries, len(self.countries))),
+            "hours": dict(sorted(self.hours.items())),
+            "top_threads": [{"thread": thread, "matches": n} for thread, n in self.threads.top(self.top_k)],
+        }
+
+    def to_state(self):
+        """Everything needed to rebuild this object elsewhere (JSON-ready, for merging)"""
+        return {
+            "matches": self.matches,
+            "original_posts": self.original_posts,
+            "posts_with_files": self.posts_with_files,
+            "keywords": self.keywords,
+            "countries": self.countries,
+            "hours": self.hours,
+            "threads": self.threads.counts,
+            "distinct_threads": base64.b64encode(self.distinct_threads.registers).decode('ascii'),
+            "distinct_posters": base64.b64encode(self.distinct_posters.registers).decode('ascii'),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a PostStats from to_state()"""
+        stats = cls()
+        stats.matches = state["matches"]
+        stats.original_posts = state["original_posts"]
+        stats.posts_with_files = state["posts_with_files"]
+        stats.keywords = dict(state["keywords"])
+        stats.countries = dict(state["countries"])
+        stats.hours = dict(state["hours"])
+        stats.threads.counts = dict(state["threads"])
+        stats.distinct_threads.registers = bytearray(base64.b64decode(state["distinct_threads"]))
+        stats.distinct_posters.registers = bytearray(base64.b64decode(state["distinct_posters"]))
+        return stats
+
+    def save(self, path):
+        """Write summary() as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False)
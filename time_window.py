@@ -0,0 +1,37 @@
+from bisect import bisect_left, bisect_right
+
+# ============================================================================
+# TIME WINDOW PLANNING
+# ============================================================================
+# A thread can only hold posts inside [start, end] if it was started before the
+# end of the window and its last reply is not older than the start. The catalog
+# gives both without downloading the thread: the OP's "time" and the time of the
+# newest entry in "last_replies" (falling back to "last_modified").
+#
+# Posts inside a thread are in posting order, so their times never decrease and
+# the posts inside the window are one slice, found by bisection instead of a scan.
+
+def last_activity(catalog_thread):
+    """Unix time of a catalog thread's newest reply (OP time if it has none)"""
+    replies = catalog_thread.get('last_replies')
+    if replies:
+        return replies[-1].get('time', 0)
+    if catalog_thread.get('replies'):
+        # Replies exist but no preview: last_modified also moves on deletions, but is never too early
+        return catalog_thread.get('last_modified', catalog_thread.get('time', 0))
+    return catalog_thread.get('time', 0)
+
+def thread_overlaps(catalog_thread, start_timestamp, end_timestamp):
+    """True if the thread may contain posts inside the window"""
+    if catalog_thread.get('time', 0) > end_timestamp:
+        return False
+    return last_activity(catalog_thread) >= start_timestamp
+
+def posts_in_window(posts, start_timestamp, end_timestamp):
+    """The slice of a thread's posts (in posting order) with start <= time <= end"""
+    first = bisect_left(posts, start_timestamp, key=_post_time)
+    last = bisect_right(posts, end_timestamp, lo=first, key=_post_time)
+    return posts[first:last]
+
+def _post_time(post):
+    return post.get('time', 0)
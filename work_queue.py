@@ -0,0 +1,186 @@
+import json
+import os
+import socket
+import time
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# A claimed task whose worker has not reported for this long is given to
+# another worker (the worker crashed or its machine went away)
+CLAIM_TIMEOUT = 600
+
+# Seconds an idle worker waits before looking again while other workers still
+# hold tasks (they may fail, die or add retry tasks)
+IDLE_POLL = 5
+
+# ============================================================================
+# FILE WORK QUEUE
+# ============================================================================
+# A directory any number of processes can take work from - on one machine or on
+# several machines sharing the directory - without a server. Every task is one
+# JSON file that moves between sub-directories by rename, which is atomic, so
+# two workers can never claim the same task:
+#
+#   queue/job.json             settings every worker uses (keywords, filters, ...)
+#   queue/pending/00012.json   waiting
+#   queue/claimed/00012.json   being worked on; its modification time is the worker's heartbeat
+#   queue/done/00012.json      finished, with the worker's result
+#   queue/results/00012.jsonl  output written by the worker for that task
+#
+# Workers write their output to a temporary file of their own, moved into place
+# when the task is completed, so a task done twice (its first worker was only
+# slow) never has one worker truncating the other's results. A finished task is
+# only moved to done/ after its results are complete, so a task whose worker
+# died is simply done again by someone else.
+
+def worker_name(index):
+    """Name identifying a worker process across machines"""
+    return f"{socket.gethostname()}-{os.getpid()}-{index}"
+
+def _pid_alive(pid):
+    """False if no process with this pid runs on this machine (always True on Windows)"""
+    if os.name == 'nt':
+        # os.kill(pid, 0) would send Ctrl+C there; stale claims still time out
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class WorkQueue:
+    """Task queue kept as files in a (possibly shared) directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        for sub in ("pending", "claimed", "done", "results"):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+        self.job_path = os.path.join(directory, "job.json")
+
+    def _path(self, state, task_id):
+        return os.path.join(self.directory, state, f"{task_id}.json")
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _ids(self, state):
+        return sorted(name[:-len(".json")] for name in os.listdir(os.path.join(self.directory, state))
+                      if name.endswith(".json"))
+
+    def job(self):
+        """The job settings, or None if the queue was never filled"""
+        if not os.path.exists(self.job_path):
+            return None
+        with open(self.job_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def fill(self, job, tasks):
+        """Start a job: its settings and one pending task per payload"""
+        for number, payload in enumerate(tasks):
+            self._write(self._path("pending", f"{number:05d}"), payload)
+        # Written last: workers only start on a completely filled queue
+        self._write(self.job_path, job)
+
+    def claim(self, worker):
+        """Take the next pending task: (task_id, payload), or None when nothing is pending"""
+        for task_id in self._ids("pending"):
+            pending = self._path("pending", task_id)
+            claimed = self._path("claimed", task_id)
+            try:
+                # Fresh timestamp first, so the claim is never mistaken for a stale one
+                os.utime(pending)
+                os.rename(pending, claimed)
+            except FileNotFoundError:
+                continue  # another worker was faster
+            with open(claimed, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            payload["worker"] = worker
+            self._write(claimed, payload)
+            return task_id, payload
+        return None
+
+    def add(self, task_id, payload):
+        """Queue one more task while the job runs (e.g. a retry); ids sort in merge order"""
+        self._write(self._path("pending", task_id), payload)
+
+    def release(self, task_id, payload):
+        """Put a claimed task back into pending, e.g. after an error, with an updated payload"""
+        self._write(self._path("pending", task_id), payload)
+        try:
+            os.remove(self._path("claimed", task_id))
+        except FileNotFoundError:
+            pass
+
+    def heartbeat(self, task_id):
+        """Tell the others this task is still being worked on"""
+        try:
+            os.utime(self._path("claimed", task_id))
+        except FileNotFoundError:
+            pass
+
+    def results_path(self, task_id):
+        return os.path.join(self.directory, "results", f"{task_id}.jsonl")
+
+    def results_tmp_path(self, task_id, worker):
+        """Where a worker writes a task's output until complete() moves it into place"""
+        return os.path.join(self.directory, "results", f"{task_id}.{worker}.tmp")
+
+    def complete(self, task_id, payload, result, results_tmp=None):
+        """Mark a claimed task finished, first moving its complete results file into place"""
+        if results_tmp:
+            os.replace(results_tmp, self.results_path(task_id))
+        self._write(self._path("done", task_id), {**payload, "result": result})
+        try:
+            os.remove(self._path("claimed", task_id))
+        except FileNotFoundError:
+            pass
+
+    def requeue_stale(self, timeout=CLAIM_TIMEOUT):
+        """Put tasks whose worker stopped reporting back into pending, returning how many"""
+        requeued = 0
+        now = time.time()
+        for task_id in self._ids("claimed"):
+            claimed = self._path("claimed", task_id)
+            try:
+                if now - os.path.getmtime(claimed) < timeout or os.path.exists(self._path("done", task_id)):
+                    continue
+                os.rename(claimed, self._path("pending", task_id))
+                requeued += 1
+            except FileNotFoundError:
+                continue
+        return requeued
+
+    def requeue_dead(self):
+        """Put tasks claimed by workers of this machine that no longer run back into pending"""
+        host = socket.gethostname()
+        requeued = 0
+        for task_id in self._ids("claimed"):
+            claimed = self._path("claimed", task_id)
+            try:
+                with open(claimed, 'r', encoding='utf-8') as f:
+                    worker_host, pid, _ = json.load(f).get("worker", "").rsplit("-", 2)
+                if worker_host != host or _pid_alive(int(pid)) or os.path.exists(self._path("done", task_id)):
+                    continue
+                os.rename(claimed, self._path("pending", task_id))
+                requeued += 1
+            except (FileNotFoundError, ValueError):
+                # Gone meanwhile, or claimed a moment ago and not yet named
+                continue
+        return requeued
+
+    def counts(self):
+        """Number of tasks per state"""
+        return {state: len(self._ids(state)) for state in ("pending", "claimed", "done")}
+
+    def done_tasks(self):
+        """Finished tasks in task order: (task_id, payload with "result")"""
+        for task_id in self._ids("done"):
+            with open(self._path("done", task_id), 'r', encoding='utf-8') as f:
+                yield task_id, json.load(f)